@@ -6,7 +6,7 @@ from datetime import datetime
 import asyncpg
 from fastapi.params import Header
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 from fastapi import APIRouter, HTTPException
 
@@ -20,9 +20,16 @@ class FilterOptions(BaseModel):
     include_domains: Optional[List[str]] = Field(default=None, description="Only crawl from these domains")
     exclude_domains: Optional[List[str]] = Field(default=None, description="Exclude results from these domains")
 
+class CrawlOptions(BaseModel):
+    page_readiness: Optional[Literal["dom_stable", "load", "domcontentloaded", "networkidle", "fixed"]] = Field(
+        default=None, description="How the crawler decides a page has finished rendering"
+    )
+    readiness_cap_ms: Optional[int] = Field(default=None, ge=0, le=30000, description="Upper bound on the readiness wait per page")
+
 class CreateJobRequest(BaseModel):
     input_text: str
     filters: Optional[FilterOptions] = Field(default_factory=FilterOptions)
+    crawl_options: Optional[CrawlOptions] = Field(default_factory=CrawlOptions)
     test_email: Optional[str] = Field(default=None, description="If provided, all outreach emails will go to this test address")
 
 # --- Response model ---
@@ -48,6 +55,9 @@ async def create_job(
     - **filters** (`FilterOptions`, optional): 
         - `include_domains`: List of domains to exclusively crawl from.
         - `exclude_domains`: List of domains to avoid.
+    - **crawl_options** (`CrawlOptions`, optional):
+        - `page_readiness`: `dom_stable` (default), `load`, `domcontentloaded`, `networkidle` or `fixed`.
+        - `readiness_cap_ms`: Maximum time to wait for a page to become ready.
     - **test_email** (`str`, optional): If provided, outreach emails will not be sent to extracted contacts; instead, they'll be sent only to this test address.
 
     ### Headers:
@@ -86,8 +96,8 @@ async def create_job(
     try:
         statements = [
             (
-                "INSERT INTO jobs (id, input_text, filters, status) VALUES ($1, $2, $3, 'PENDING') RETURNING id, created_at",
-                [job_id, req.input_text, json.dumps(req.filters.model_dump())],
+                "INSERT INTO jobs (id, input_text, filters, crawl_options, status) VALUES ($1, $2, $3, $4, 'PENDING') RETURNING id, created_at",
+                [job_id, req.input_text, json.dumps(req.filters.model_dump()), json.dumps(req.crawl_options.model_dump(exclude_none=True))],
                 True
             ),
             (
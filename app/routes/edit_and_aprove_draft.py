@@ -4,8 +4,6 @@ from fastapi.params import Header, Query
 from pydantic import BaseModel
 from app.postgres import POSTGRES
 
-from app.utils.send_email import send_outreach_email
-
 router = APIRouter(tags=["Edit and Approve Drafts"])
 
 class ApproveRequest(BaseModel):
@@ -18,10 +16,11 @@ async def approve_and_send_draft(
     x_api_key: str = Header(..., description="API Key for authentication")
 ):
     """
-    Approve and send an outreach email draft.
+    Approve an outreach email draft and queue it for sending.
 
-    This endpoint finalizes and sends a drafted outreach email. It allows optional editing of the draft before sending. 
-    Once approved, the email is sent to the contact and the system updates the statuses accordingly.
+    This endpoint finalizes a drafted outreach email. It allows optional editing of the draft before sending. 
+    Once approved, the email is queued in the mail outbox and delivered by the mail dispatch worker,
+    so the request returns without waiting on SMTP.
 
     ### Query Parameters:
     - **draft_id** (`str`, required): UUID of the draft to approve. Must reference a reply with `status = 'DRAFTED'`.
@@ -34,16 +33,16 @@ async def approve_and_send_draft(
 
     ### Behavior:
     - Fetches the draft content and associated contact email.
-    - If found and in the correct status, sends the email (using `send_outreach_email`).
-    - Updates:
-        - `replies.status` to `'SENT'`
+    - If found and in the correct status, queues the email in `mail_outbox`.
+    - Updates, in the same transaction:
+        - `replies.status` to `'QUEUED'` (`'SENT'` once delivered, `'FAILED'` if delivery gives up)
         - `outreach_contacts.status` to `'REPLIED_BY_US'` with a new `updated_at` timestamp.
-    - If the draft is not found or already sent, returns a 404 error.
+    - If the draft is not found or already approved, returns a 404 error.
 
     ### Response:
     ```json
     {
-    "status": "sent",
+    "status": "queued",
     "email": "recipient@example.com"
     }
     """
@@ -59,16 +58,28 @@ async def approve_and_send_draft(
 
     final_text = body.edited_text.strip() if body and body.edited_text else row["draft_text"]
 
-    await send_outreach_email(row["email"], final_text)
-
-    await POSTGRES.execute(
-        "UPDATE replies SET status = 'SENT' WHERE id = $1",
-        (draft_id,)
-    )
-
-    await POSTGRES.execute(
-        "UPDATE outreach_contacts SET status = 'REPLIED_BY_US', updated_at = now() WHERE id = $1",
-        (row["outreach_contact_id"],)
-    )
-
-    return {"status": "sent", "email": row["email"]}
+    await POSTGRES.execute_transaction_with_results([
+        (
+            # A failed delivery puts the contact back to REPLIED so a fresh draft is made
+            """
+            INSERT INTO mail_outbox (
+                kind, to_email, subject, body, contact_id, contact_status_expected, contact_status_on_failure, reply_id
+            )
+            VALUES ('reply', $1, 'Follow-up regarding your message', $2, $3, 'REPLIED_BY_US', 'REPLIED', $4)
+            """,
+            (row["email"], final_text, row["outreach_contact_id"], draft_id),
+            False
+        ),
+        (
+            "UPDATE replies SET status = 'QUEUED' WHERE id = $1",
+            (draft_id,),
+            False
+        ),
+        (
+            "UPDATE outreach_contacts SET status = 'REPLIED_BY_US', updated_at = now() WHERE id = $1",
+            (row["outreach_contact_id"],),
+            False
+        ),
+    ])
+
+    return {"status": "queued", "email": row["email"]}
@@ -5,21 +5,29 @@ import os
 router = APIRouter(tags=["Get File"])
 
 SHARED_DIR = os.getenv("SHARED_DIR", "/app/shared")
+FILE_TYPES = {"images", "previews", "ots"}
+# Screenshot and preview names end in their content hash, so a name never points at different bytes
+IMMUTABLE_FILE_TYPES = {"images", "previews"}
 
 @router.get("/files")
 async def get_public_file(
     filename: str,
-    type: str = Header(..., description="Type of file to retrieve (image or ots)"),
+    type: str = Header(..., description="Type of file to retrieve (images, previews or ots)"),
     x_api_key: str = Header(..., description="API Key for authentication")
 ):
     """
-    Serve screenshot or OTS file by filename.
-    Take file path from list drafts API
+    Serve screenshot, screenshot preview or OTS file by filename.
+    Take file path from list drafts API. Previews are small WebP/JPEG
+    versions of the screenshot, meant for viewing; images holds the lossless
+    PNG evidence that the OTS file timestamps.
     """
+    if type not in FILE_TYPES:
+        raise HTTPException(status_code=400, detail=f"type must be one of: {', '.join(sorted(FILE_TYPES))}")
     safe_filename = os.path.basename(filename)
     file_path = os.path.join(SHARED_DIR, type, safe_filename)
 
     if not os.path.isfile(file_path):
         raise HTTPException(status_code=404, detail="File not found")
 
-    return FileResponse(file_path)
+    headers = {"Cache-Control": "private, max-age=31536000, immutable"} if type in IMMUTABLE_FILE_TYPES else None
+    return FileResponse(file_path, headers=headers)
@@ -26,6 +26,7 @@ CREATE TABLE public.jobs (
     id uuid DEFAULT gen_random_uuid() NOT NULL,
     input_text text,
     filters jsonb,
+    crawl_options jsonb,
     status public.status_enum_v2 DEFAULT 'PENDING' NOT NULL,
     created_at timestamp DEFAULT now(),
     updated_at timestamp DEFAULT now(),
@@ -38,6 +39,7 @@ CREATE TABLE public.crawl_events (
     created_at timestamp DEFAULT now(),
     is_processing boolean DEFAULT false,
     progress_updated_at timestamp,
+    lease_token uuid,
     PRIMARY KEY (id),
     FOREIGN KEY (job_id) REFERENCES public.jobs(id) ON DELETE CASCADE
 );
@@ -48,8 +50,16 @@ CREATE TABLE public.crawl_results (
     url text NOT NULL,
     matched_snippet text,
     match_score integer,
+    match_start integer,
+    match_end integer,
+    match_norm_start integer,
+    match_norm_end integer,
     screenshot_path text,
+    screenshot_sha256 text,
+    preview_path text,
     ots_path text,
+    ots_attempts integer DEFAULT 0 NOT NULL,
+    ots_next_attempt_at timestamptz DEFAULT now() NOT NULL,
     "timestamp" timestamptz DEFAULT now(),
     status public.crawl_status_enum_v1 NOT NULL,
     PRIMARY KEY (id),
@@ -66,6 +76,7 @@ CREATE TABLE public.outreach_contacts (
     updated_at timestamptz DEFAULT now(),
     source text CHECK (source = ANY (ARRAY['html', 'mailto', 'guessed', 'whois'])),
     is_processing boolean DEFAULT false,
+    processing_started_at timestamptz,
     last_reply_text text,
     reply_received_at timestamptz DEFAULT now(),
     PRIMARY KEY (id),
@@ -92,3 +103,74 @@ CREATE TABLE public.test_email_map (
     PRIMARY KEY (job_id),
     FOREIGN KEY (job_id) REFERENCES public.jobs(id)
 );
+
+CREATE TABLE public.whois_cache (
+    domain text NOT NULL,
+    emails jsonb NOT NULL DEFAULT '[]',
+    fetched_at timestamptz DEFAULT now(),
+    PRIMARY KEY (domain)
+);
+
+CREATE TABLE public.search_cache (
+    query_hash text NOT NULL,
+    page integer NOT NULL,
+    links jsonb NOT NULL DEFAULT '[]',
+    fetched_at timestamptz DEFAULT now(),
+    PRIMARY KEY (query_hash, page)
+);
+
+-- Transactional outbox: senders insert rendered mail here, mail_dispatch_worker delivers it
+CREATE TABLE public.mail_outbox (
+    id uuid DEFAULT gen_random_uuid() NOT NULL,
+    kind text NOT NULL,
+    to_email text NOT NULL,
+    subject text NOT NULL,
+    body text NOT NULL,
+    attachments jsonb NOT NULL DEFAULT '[]',
+    contact_id uuid,
+    -- The contact's status when the mail was queued; delivery only moves a contact still in it
+    contact_status_expected text,
+    contact_status_on_sent text,
+    contact_status_on_failure text,
+    job_id uuid,
+    job_status_on_sent text,
+    reply_id uuid,
+    status text DEFAULT 'PENDING' NOT NULL CHECK (status = ANY (ARRAY['PENDING', 'SENDING', 'SENT', 'BOUNCED', 'FAILED'])),
+    attempts integer DEFAULT 0 NOT NULL,
+    next_attempt_at timestamptz DEFAULT now(),
+    claimed_at timestamptz,
+    last_error text,
+    created_at timestamptz DEFAULT now(),
+    sent_at timestamptz,
+    PRIMARY KEY (id),
+    FOREIGN KEY (contact_id) REFERENCES public.outreach_contacts(id),
+    FOREIGN KEY (job_id) REFERENCES public.jobs(id) ON DELETE CASCADE,
+    FOREIGN KEY (reply_id) REFERENCES public.replies(id)
+);
+
+-- Wakeups for workers blocked in NOTIFY.wait(); the payload is the row id, channels are table names
+CREATE FUNCTION public.notify_table_change() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify(TG_TABLE_NAME, NEW.id::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER crawl_events_inserted AFTER INSERT ON public.crawl_events
+    FOR EACH ROW EXECUTE FUNCTION public.notify_table_change();
+CREATE TRIGGER crawl_events_released AFTER UPDATE OF is_processing ON public.crawl_events
+    FOR EACH ROW WHEN (NOT NEW.is_processing) EXECUTE FUNCTION public.notify_table_change();
+
+CREATE TRIGGER outreach_contacts_inserted AFTER INSERT ON public.outreach_contacts
+    FOR EACH ROW EXECUTE FUNCTION public.notify_table_change();
+CREATE TRIGGER outreach_contacts_changed AFTER UPDATE OF status, is_processing ON public.outreach_contacts
+    FOR EACH ROW WHEN (OLD.status IS DISTINCT FROM NEW.status OR (OLD.is_processing AND NOT NEW.is_processing))
+    EXECUTE FUNCTION public.notify_table_change();
+
+-- Only a rejection needs a fresh draft; the drafter's own inserts must not wake it
+CREATE TRIGGER replies_rejected AFTER UPDATE OF status ON public.replies
+    FOR EACH ROW WHEN (NEW.status = 'REJECTED' AND OLD.status IS DISTINCT FROM NEW.status)
+    EXECUTE FUNCTION public.notify_table_change();
+
+CREATE TRIGGER mail_outbox_inserted AFTER INSERT ON public.mail_outbox
+    FOR EACH ROW EXECUTE FUNCTION public.notify_table_change();
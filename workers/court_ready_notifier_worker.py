@@ -2,36 +2,13 @@ import os
 import asyncio
 import logging
 from utils.postgres import POSTGRES
-from utils.email_sender import send_outreach_email
-from datetime import datetime
-from email.message import EmailMessage
-import mimetypes
-
-Z_EMAIL_FROM = os.getenv("Z_EMAIL_FROM")
+from utils.notify import NOTIFY
+from utils.outbox import attachment, outbox_insert
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 def file_exists(path: str) -> bool:
-    return os.path.isfile(path) and os.path.getsize(path) > 0
-
-def build_email_message(to: str, subject: str, body: str, attachments: list[str] = None) -> EmailMessage:
-    msg = EmailMessage()
-    msg["From"] = Z_EMAIL_FROM
-    msg["To"] = to
-    msg["Subject"] = subject
-    msg.set_content(body)
-
-    if attachments:
-        for file_path in attachments:
-            mime_type, _ = mimetypes.guess_type(file_path)
-            maintype, subtype = mime_type.split("/") if mime_type else ("application", "octet-stream")
-
-            with open(file_path, "rb") as f:
-                file_data = f.read()
-                file_name = os.path.basename(file_path)
-                msg.add_attachment(file_data, maintype=maintype, subtype=subtype, filename=file_name)
-
-    return msg
+    return bool(path) and os.path.isfile(path) and os.path.getsize(path) > 0
 
 async def send_court_ready_email(contact):
     contact_email = contact["email"]
@@ -39,7 +16,7 @@ async def send_court_ready_email(contact):
     job_id = contact["job_id"]
 
     crawl_result = await POSTGRES.fetch_one("""
-        SELECT url, screenshot_path, ots_path, matched_snippet
+        SELECT url, screenshot_path, screenshot_sha256, ots_path, matched_snippet
         FROM crawl_results
         WHERE id = $1
     """, (crawl_result_id,))
@@ -63,8 +40,9 @@ async def send_court_ready_email(contact):
     Email: {contact_email}
     URL: {url}
     Snippet: {snippet}
+    Screenshot SHA-256: {crawl_result["screenshot_sha256"] or "<not recorded>"}
 
-    Please find attached the screenshot and OTS timestamp.
+    Please find attached the lossless screenshot and OTS timestamp.
 
     Regards,
     Third Chair Bot
@@ -72,25 +50,27 @@ async def send_court_ready_email(contact):
 
     attachments = []
     if file_exists(screenshot_path):
-        attachments.append(screenshot_path)
+        # Sent byte-for-byte (never re-encoded as an image) so it still verifies against the OTS proof
+        attachments.append(attachment(screenshot_path, mime_type="application/octet-stream"))
     if file_exists(ots_path):
-        attachments.append(ots_path)
-
-    msg = build_email_message(to=contact_email, subject=subject, body=body, attachments=attachments)
-
-    success = await send_outreach_email(msg)
-
-    if success:
-        await POSTGRES.execute("""
-            UPDATE jobs SET status = 'COURT_NOTICE_SENT', updated_at = now() WHERE id = $1
-        """, [job_id])
-        await POSTGRES.execute("""
-            UPDATE outreach_contacts
-            SET status = 'COURT_NOTICE_SENT', is_processing = false, updated_at = now()
-            WHERE id = $1
-        """, [contact["id"]])
-    else:
-        logging.error(f"[COURT] Failed to notify client for contact={contact['id']}")
+        attachments.append(attachment(ots_path))
+
+    # The contact stays is_processing until mail_dispatch_worker reports the delivery
+    await POSTGRES.execute_transaction_with_results([
+        outbox_insert(
+            "court_ready",
+            contact_email,
+            subject,
+            body,
+            attachments,
+            contact_id=contact["id"],
+            contact_status_expected="COURT_READY",
+            contact_status_on_sent="COURT_NOTICE_SENT",
+            job_id=job_id,
+            job_status_on_sent="COURT_NOTICE_SENT",
+        )
+    ])
+    logging.info(f"[COURT] Queued court-ready notice for contact={contact['id']}")
 
 
 async def court_ready_worker():
@@ -106,8 +86,8 @@ async def court_ready_worker():
             """)
 
             if not contacts:
-                logging.info("[COURT] No court-ready contacts found. Retrying in 30 seconds...")
-                await asyncio.sleep(30)
+                logging.info("[COURT] No court-ready contacts found. Waiting for status changes...")
+                await NOTIFY.wait("outreach_contacts")
                 continue
             logging.info(f"[COURT] Found {len(contacts)} court-ready contacts.")
             for contact in contacts:
@@ -1,11 +1,18 @@
 import os
-
+import uuid
 import asyncio
 import logging
 from utils.postgres import POSTGRES
 from utils.crawler import crawler_fun  
+from utils.browser_pool import BROWSER
+from utils.http_fetch import HTTP
+from utils.search_client import SEARCH
+from utils.cpu_pool import CPU_POOL
+from utils.notify import NOTIFY
 
 CRAWL_TIMEOUT_MINUTES = int(os.getenv("CRAWLER_TIMEOUT_MINUTES", 5))
+# Well under CRAWL_TIMEOUT_MINUTES, so a live crawl is never mistaken for an abandoned one
+CRAWL_HEARTBEAT_SECONDS = int(os.getenv("CRAWL_HEARTBEAT_SECONDS", 30))
 
 def setup_logging():
     logging.basicConfig(
@@ -14,60 +21,106 @@ def setup_logging():
     )
 
 
-async def fetch_crawl_ready_job():
+async def claim_crawl_event():
+    """
+    Atomically claim the oldest free (or abandoned) crawl event under a fresh lease token.
+    SKIP LOCKED lets any number of crawl workers poll the queue without taking the same row.
+    """
     query = """
-      SELECT * FROM crawl_events 
-      WHERE (
-          is_processing = FALSE 
-          OR (is_processing = TRUE AND progress_updated_at < now() - INTERVAL '1 minute' * $1)
+      UPDATE crawl_events
+      SET is_processing = TRUE, progress_updated_at = now(), lease_token = $2
+      WHERE id = (
+          SELECT id FROM crawl_events
+          WHERE (
+              is_processing = FALSE
+              OR (is_processing = TRUE AND progress_updated_at < now() - INTERVAL '1 minute' * $1)
+          )
+          ORDER BY created_at ASC
+          LIMIT 1
+          FOR UPDATE SKIP LOCKED
       )
-      ORDER BY created_at ASC
-      LIMIT 1
+      RETURNING *
+    """
+    return await POSTGRES.fetch_one(query, (CRAWL_TIMEOUT_MINUTES, uuid.uuid4()))
+
+async def renew_lease(event_id, lease_token) -> bool:
+    query = """
+    UPDATE crawl_events
+    SET progress_updated_at = now()
+    WHERE id = $1 AND lease_token = $2
+    RETURNING id
     """
-    return await POSTGRES.fetch_one(query, (CRAWL_TIMEOUT_MINUTES, ))
+    return await POSTGRES.fetch_one(query, [event_id, lease_token]) is not None
+
+async def heartbeat(event_id, lease_token, crawl_task: asyncio.Task) -> bool:
+    """Keep the lease alive while the crawl runs. Cancels the crawl and returns True if the lease was lost."""
+    while True:
+        await asyncio.sleep(CRAWL_HEARTBEAT_SECONDS)
+        try:
+            if await renew_lease(event_id, lease_token):
+                continue
+        except Exception as e:
+            logging.warning(f"[CRAWLER] Heartbeat failed for event {event_id}: {e}")
+            continue
+        logging.warning(f"[CRAWLER] Lease on event {event_id} was taken over, stopping crawl")
+        crawl_task.cancel()
+        return True
 
-async def mark_event_in_progress(event_id):
+async def delete_event(event_id, lease_token):
+    query = "DELETE FROM crawl_events WHERE id = $1 AND lease_token = $2"
+    await POSTGRES.execute(query, [event_id, lease_token])
+
+async def release_event(event_id, lease_token):
     query = """
-    UPDATE crawl_events 
-    SET is_processing = TRUE, progress_updated_at = now()
-    WHERE id = $1
+    UPDATE crawl_events
+    SET is_processing = FALSE, progress_updated_at = now(), lease_token = NULL
+    WHERE id = $1 AND lease_token = $2
     """
-    await POSTGRES.execute(query, [event_id])
+    await POSTGRES.execute(query, [event_id, lease_token])
 
-async def delete_event(event_id):
-    query = "DELETE FROM crawl_events WHERE id = $1"
-    await POSTGRES.execute(query, [event_id])
+async def run_with_lease(job_id, event_id, lease_token) -> bool:
+    """Run the crawl under a heartbeat. Returns False if the lease was lost before the crawl finished."""
+    crawl_task = asyncio.create_task(crawler_fun(job_id))
+    heartbeat_task = asyncio.create_task(heartbeat(event_id, lease_token, crawl_task))
+    try:
+        await crawl_task
+        return True
+    except asyncio.CancelledError:
+        if heartbeat_task.done() and not heartbeat_task.cancelled() and heartbeat_task.result():
+            return False
+        raise
+    finally:
+        heartbeat_task.cancel()
+        await asyncio.gather(heartbeat_task, return_exceptions=True)
 
 async def start_crawl_worker():
     while True:
+        job_event = None
         try:
             logging.info("[CRAWLER] Checking for crawl-ready jobs...")
-            job_event = await fetch_crawl_ready_job()
+            job_event = await claim_crawl_event()
             if job_event:
-                logging.info(f"[CRAWLER] Found job_event: {job_event['id']} for job_id={job_event['job_id']}")
+                logging.info(f"[CRAWLER] Claimed job_event: {job_event['id']} for job_id={job_event['job_id']}")
                 event_id = job_event["id"]
                 job_id = job_event["job_id"]
-
-                await mark_event_in_progress(event_id)
+                lease_token = job_event["lease_token"]
 
                 logging.info(f"[CRAWLER] Processing job_id={job_id}")
-                await crawler_fun(job_id, event_id)
-                logging.info(f"[CRAWLER] Completed job_id={job_id}")
-                await delete_event(event_id)
-                logging.info(f"[CRAWLER] Deleted job_event with id={event_id}")
+                if await run_with_lease(job_id, event_id, lease_token):
+                    logging.info(f"[CRAWLER] Completed job_id={job_id}")
+                    await delete_event(event_id, lease_token)
+                    logging.info(f"[CRAWLER] Deleted job_event with id={event_id}")
             else:
-                await asyncio.sleep(30)  # Sleep before next check
+                await NOTIFY.wait("crawl_events")  # New or released events wake us straight away
         except Exception as e:
             logging.exception(f"[CRAWLER] Unexpected error: {e}")
-            query = """
-            UPDATE crawl_events 
-            SET is_processing = FALSE, progress_updated_at = now()
-            WHERE id = $1
-            """
-            await POSTGRES.execute(query, [event_id])
+            if job_event:
+                await release_event(job_event["id"], job_event["lease_token"])
 
 async def main():
     await POSTGRES.init()
+    await BROWSER.init()
+    CPU_POOL.init()
 
     try:
         await start_crawl_worker()
@@ -76,6 +129,18 @@ async def main():
     except Exception as e:
         logging.exception(f"[CRAWLER] Unexpected error: {e}")
     finally:
+        logging.info("[CRAWLER] Closing browser pool...")
+        try:
+            await BROWSER.close()
+        except Exception as e:
+            logging.exception("[CRAWLER] Error during closing browser pool")
+        try:
+            await SEARCH.close()
+            await HTTP.close()
+        except Exception as e:
+            logging.exception("[CRAWLER] Error during closing HTTP client")
+        CPU_POOL.close()
+        await NOTIFY.close()
         logging.info("[CRAWLER] Closing PostgreSQL pool...")
         try:
             await POSTGRES.close()
@@ -3,8 +3,9 @@ import datetime
 import asyncio
 import logging
 from utils.postgres import POSTGRES
-from utils.email_sender import send_outreach_email
-from email.message import EmailMessage
+from utils.notify import NOTIFY
+from utils.outbox import outbox_insert, PENDING_MAIL_FOR_CONTACT
+from utils.templates import TEMPLATES
 
 logging.basicConfig(
     level=logging.INFO,  
@@ -12,10 +13,6 @@ logging.basicConfig(
 )
 
 
-EMAIL_TEMPLATE_DIR = "email_templates/"
-Z_EMAIL_FROM = os.getenv("Z_EMAIL_FROM")
-SHARED_DIR = os.getenv("SHARED_DIR", "/app/shared")
-
 # Time thresholds
 THRESHOLDS = {
     "REPLIED_BY_US": int(os.getenv("REPLY_TO_NUDGE_1_DAYS", 5)),
@@ -32,45 +29,34 @@ ESCALATION_MAP = {
     "LEGAL_LETTER_SENT": ("COURT_READY", "legal_letter_sent_final.txt")
 }
 
-SHARED_DIR = os.getenv("SHARED_DIR", "/app/shared")
-
-def load_template(filename: str):
-    path = os.path.join(SHARED_DIR, f"email_templates/{filename}")
-
-    with open(path, "r", encoding="utf-8") as f:
-        content = f.read()
-
-    subject_line, body = content.split("\n", 1)
-    subject = subject_line.replace("Subject:", "").strip()
-    return subject, body.strip()
-
 
 async def escalate_contact(contact, current_status):
     contact_id = contact["id"]
     email = contact["email"]
-    updated_at = contact["updated_at"]
+    now = datetime.datetime.now(datetime.timezone.utc)
 
     next_status, template_file = ESCALATION_MAP[current_status]
-    subject, body = load_template(template_file)
-
-    msg = EmailMessage()
-    msg["To"] = email
-    msg["From"] = Z_EMAIL_FROM
-    msg["Subject"] = subject
-    msg.set_content(body)
-
-    logging.info(f"[ESCALATION] Sending {next_status} to {email}...")
-    result = await send_outreach_email(msg)
-
-    if result == True:
-        await POSTGRES.execute("""
-            UPDATE outreach_contacts
-            SET status = $1, updated_at = now()
-            WHERE id = $2
-        """, (next_status, contact_id))
-        logging.info(f"[ESCALATION] ✅ Updated status to {next_status} for {email}")
-    else:
-        logging.warning(f"[ESCALATION] ❌ Failed to send to {email}")
+    subject, body = TEMPLATES.get(template_file).render(
+        url=contact["url"] or "",
+        snippet=(contact["matched_snippet"] or "").strip(),
+        email=email,
+        date=now.date().isoformat(),
+        timestamp=now.isoformat(),
+    )
+
+    # mail_dispatch_worker moves the contact to next_status once the mail is delivered
+    await POSTGRES.execute_transaction_with_results([
+        outbox_insert(
+            "escalation",
+            email,
+            subject,
+            body,
+            contact_id=contact_id,
+            contact_status_expected=current_status,
+            contact_status_on_sent=next_status,
+        )
+    ])
+    logging.info(f"[ESCALATION] Queued {next_status} mail to {email}")
 
 
 async def check_and_escalate():
@@ -78,9 +64,13 @@ async def check_and_escalate():
         threshold_days = THRESHOLDS[status]
         cutoff_time = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(minutes=threshold_days)
 
-        contacts = await POSTGRES.fetch_all("""
-            SELECT id, email, updated_at FROM outreach_contacts
-            WHERE status = $1 AND updated_at <= $2
+        contacts = await POSTGRES.fetch_all(f"""
+            SELECT outreach_contacts.id, outreach_contacts.email, outreach_contacts.updated_at,
+                   cr.url, cr.matched_snippet
+            FROM outreach_contacts
+            LEFT JOIN crawl_results cr ON cr.id = outreach_contacts.crawl_result_id
+            WHERE outreach_contacts.status = $1 AND outreach_contacts.updated_at <= $2
+              AND NOT {PENDING_MAIL_FOR_CONTACT}
             LIMIT 10
         """, (status, cutoff_time))
         if not contacts:
@@ -93,11 +83,12 @@ async def check_and_escalate():
 
 async def escalation_worker_loop():
     logging.info("[ESCALATION] Starting escalation worker loop...")
+    TEMPLATES.validate(required=[template_file for _, template_file in ESCALATION_MAP.values()])
     while True:
         logging.info("[ESCALATION] Checking for contacts to escalate...")
         try:
             await check_and_escalate()
-            await asyncio.sleep(30)
+            await NOTIFY.wait("outreach_contacts", timeout=30)
         except Exception as e:
             logging.exception(f"[ESCALATION] Error: {e}")
             await asyncio.sleep(120)
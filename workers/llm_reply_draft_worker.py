@@ -3,6 +3,7 @@ import logging
 import datetime
 import asyncio
 from utils.postgres import POSTGRES
+from utils.notify import NOTIFY
 from utils.llm import generate_followup_reply  # your LLM wrapper
 
 
@@ -14,13 +15,16 @@ logging.basicConfig(
 async def draft_llm_followups():
     logging.info("[LLM] Looking for replied contacts without drafts...")
 
-    # Step 1: Find REPLIED contacts with no replies yet
+    # Step 1: Find REPLIED contacts with no draft waiting for approval; older SENT,
+    # FAILED or REJECTED replies do not count, so those contacts get a fresh draft
     contacts = await POSTGRES.fetch_all("""
         SELECT oc.id as contact_id, oc.email, oc.last_reply_text, cr.matched_snippet
         FROM outreach_contacts oc
-        LEFT JOIN replies pe ON pe.contact_id = oc.id
         LEFT JOIN crawl_results cr ON cr.id = oc.crawl_result_id
-        WHERE oc.status = 'REPLIED' AND (pe.id IS NULL or pe.status != 'DRAFTED')
+        WHERE oc.status = 'REPLIED'
+          AND NOT EXISTS (
+              SELECT 1 FROM replies pe WHERE pe.contact_id = oc.id AND pe.status = 'DRAFTED'
+          )
         LIMIT 10
     """)
 
@@ -73,7 +77,7 @@ async def run_drafter_periodically():
             await draft_llm_followups()
         except Exception as e:
             logging.exception(f"[LLM] Error while drafting replies: {e}")
-        await asyncio.sleep(30)  # 5 minutes
+        await NOTIFY.wait("outreach_contacts", "replies")
 
 if __name__ == "__main__":
     asyncio.run(run_drafter_periodically())
\ No newline at end of file
@@ -0,0 +1,206 @@
+import os
+import time
+import heapq
+import signal
+import random
+import asyncio
+import logging
+from utils.postgres import POSTGRES
+from utils.notify import NOTIFY
+from utils.smtp_pool import SMTP_POOL
+from utils.email_sender import send_outreach_email
+from utils.outbox import build_message
+from utils.worker_pool import WorkerPool, RateLimiter, parse_rate_overrides
+
+MAIL_DISPATCH_BATCH_SIZE = int(os.getenv("MAIL_DISPATCH_BATCH_SIZE", 20))
+MAIL_DISPATCH_MAX_IN_FLIGHT = int(os.getenv("MAIL_DISPATCH_MAX_IN_FLIGHT", 5))
+MAIL_DISPATCH_POLL_SECONDS = int(os.getenv("MAIL_DISPATCH_POLL_SECONDS", 30))
+MAIL_DISPATCH_DRAIN_SECONDS = int(os.getenv("MAIL_DISPATCH_DRAIN_SECONDS", 60))
+# Rows stuck in SENDING this long belong to a crashed dispatcher and are picked up again
+MAIL_DISPATCH_LEASE_MINUTES = int(os.getenv("MAIL_DISPATCH_LEASE_MINUTES", 10))
+MAIL_MAX_ATTEMPTS = int(os.getenv("MAIL_MAX_ATTEMPTS", 5))
+MAIL_RETRY_BASE_SECONDS = int(os.getenv("MAIL_RETRY_BASE_SECONDS", 60))
+MAIL_RETRY_MAX_SECONDS = int(os.getenv("MAIL_RETRY_MAX_SECONDS", 3600))
+# Sends per minute to each recipient mail provider (domain); 0 disables the limit
+MAIL_SENDS_PER_MINUTE = float(os.getenv("MAIL_SENDS_PER_MINUTE", 30))
+MAIL_PROVIDER_RATE_LIMITS = parse_rate_overrides(os.getenv("MAIL_PROVIDER_RATE_LIMITS", ""))
+
+SEND_POOL = WorkerPool("DISPATCH", MAIL_DISPATCH_MAX_IN_FLIGHT)
+PROVIDER_LIMITER = RateLimiter(MAIL_SENDS_PER_MINUTE, MAIL_PROVIDER_RATE_LIMITS)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+)
+
+
+async def claim_outbox(limit: int):
+    return await POSTGRES.fetch_all("""
+        UPDATE mail_outbox
+        SET status = 'SENDING', claimed_at = now(), attempts = attempts + 1
+        WHERE id IN (
+            SELECT id FROM mail_outbox
+            WHERE (status = 'PENDING' AND next_attempt_at <= now())
+               OR (status = 'SENDING' AND claimed_at < now() - INTERVAL '1 minute' * $1)
+            ORDER BY next_attempt_at ASC
+            LIMIT $2
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING *
+    """, (MAIL_DISPATCH_LEASE_MINUTES, limit))
+
+
+def retry_delay_seconds(attempts: int) -> float:
+    delay = min(MAIL_RETRY_MAX_SECONDS, MAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+# A contact that moved on while its mail was pending (e.g. the IMAP worker saw a reply)
+# keeps its newer status; only a contact still in contact_status_expected is moved
+CONTACT_STATUS_GUARD = "($3::outreach_status_v1 IS NULL OR status = $3::outreach_status_v1)"
+
+
+async def mark_sent(row):
+    queries = [("""
+        UPDATE mail_outbox SET status = 'SENT', sent_at = now(), last_error = NULL WHERE id = $1
+    """, (row["id"],), False)]
+    if row["contact_id"]:
+        queries.append((f"""
+            UPDATE outreach_contacts
+            SET status = COALESCE($1::outreach_status_v1, status), is_processing = false, updated_at = now()
+            WHERE id = $2 AND {CONTACT_STATUS_GUARD}
+        """, (row["contact_status_on_sent"], row["contact_id"], row["contact_status_expected"]), False))
+    if row["job_id"] and row["job_status_on_sent"]:
+        queries.append(("""
+            UPDATE jobs SET status = $1::status_enum_v2, updated_at = now() WHERE id = $2
+        """, (row["job_status_on_sent"], row["job_id"]), False))
+    if row["reply_id"]:
+        queries.append(("""
+            UPDATE replies SET status = 'SENT', updated_at = now() WHERE id = $1
+        """, (row["reply_id"],), False))
+    await POSTGRES.execute_transaction_with_results(queries)
+
+
+async def mark_undeliverable(row, status: str, error: str):
+    """Final failure: BOUNCED marks the contact bounced, FAILED applies contact_status_on_failure."""
+    contact_status = "BOUNCED" if status == "BOUNCED" else row["contact_status_on_failure"]
+    queries = [("""
+        UPDATE mail_outbox SET status = $1, last_error = $2 WHERE id = $3
+    """, (status, error, row["id"]), False)]
+    if row["contact_id"]:
+        queries.append((f"""
+            UPDATE outreach_contacts
+            SET status = COALESCE($1::outreach_status_v1, status), is_processing = false, updated_at = now()
+            WHERE id = $2 AND {CONTACT_STATUS_GUARD}
+        """, (contact_status, row["contact_id"], row["contact_status_expected"]), False))
+    if row["reply_id"]:
+        queries.append(("""
+            UPDATE replies SET status = 'FAILED', updated_at = now() WHERE id = $1
+        """, (row["reply_id"],), False))
+    await POSTGRES.execute_transaction_with_results(queries)
+
+
+async def schedule_retry(row, error: str):
+    delay = retry_delay_seconds(row["attempts"])
+    await POSTGRES.execute("""
+        UPDATE mail_outbox
+        SET status = 'PENDING', last_error = $1, next_attempt_at = now() + INTERVAL '1 second' * $2
+        WHERE id = $3
+    """, (error, delay, row["id"]))
+    logging.warning(f"[DISPATCH] Attempt {row['attempts']} for {row['to_email']} failed, retrying in {delay:.0f}s")
+
+
+async def defer(row, delay: float):
+    """Hand a claimed row back until its provider has a token; this is not a failed attempt."""
+    await POSTGRES.execute("""
+        UPDATE mail_outbox
+        SET status = 'PENDING', attempts = attempts - 1, next_attempt_at = now() + INTERVAL '1 second' * $1
+        WHERE id = $2
+    """, (delay, row["id"]))
+
+
+def provider(row) -> str:
+    return row["to_email"].rsplit("@", 1)[-1].lower()
+
+
+async def deliver(row):
+    to_email = row["to_email"]
+    try:
+        msg = await asyncio.to_thread(build_message, row)
+        result = await send_outreach_email(msg)
+    except asyncio.CancelledError:
+        # Drain timed out: put the row straight back rather than waiting out the lease
+        await POSTGRES.execute("""
+            UPDATE mail_outbox SET status = 'PENDING', attempts = attempts - 1 WHERE id = $1
+        """, (row["id"],))
+        raise
+    except Exception as e:
+        result = "FAILED"
+        logging.exception(f"[DISPATCH] Could not build or send {row['kind']} mail to {to_email}: {e}")
+
+    if result is True:
+        await mark_sent(row)
+        logging.info(f"[DISPATCH] ✅ Sent {row['kind']} mail to {to_email}")
+    elif result == "BOUNCED":
+        await mark_undeliverable(row, "BOUNCED", "Recipient refused")
+        logging.warning(f"[DISPATCH] 🚫 {to_email} bounced")
+    elif row["attempts"] >= MAIL_MAX_ATTEMPTS:
+        await mark_undeliverable(row, "FAILED", "Gave up after retries")
+        logging.error(f"[DISPATCH] ❌ Giving up on {row['kind']} mail to {to_email} after {row['attempts']} attempts")
+    else:
+        await schedule_retry(row, "Send failed")
+
+
+async def mail_dispatch_worker_loop():
+    logging.info("[DISPATCH] Starting mail dispatch worker...")
+    # When rows handed back for lack of a provider token are due again
+    deferred_due = []
+    while True:
+        try:
+            await SEND_POOL.wait_for_slot()
+            rows = await claim_outbox(min(MAIL_DISPATCH_BATCH_SIZE, SEND_POOL.available))
+            # Rows whose provider has no token yet go back to the outbox rather than waiting in a
+            # slot, so one slow provider cannot hold up mail to every other one. Later rows for the
+            # same provider are spaced out behind the first instead of all coming back at once.
+            deferred = {}
+            for row in rows:
+                key = provider(row)
+                if key not in deferred:
+                    delay = PROVIDER_LIMITER.try_acquire(key)
+                    if delay <= 0:
+                        await SEND_POOL.submit(deliver, row)
+                        continue
+                    deferred[key] = [delay, 0]
+                delay, count = deferred[key]
+                delay += count * 60 / PROVIDER_LIMITER.rate_for(key)
+                deferred[key][1] += 1
+                await defer(row, delay)
+                heapq.heappush(deferred_due, time.monotonic() + delay)
+            if len(rows) == 0:
+                while deferred_due and deferred_due[0] <= time.monotonic():
+                    heapq.heappop(deferred_due)
+                timeout = MAIL_DISPATCH_POLL_SECONDS
+                if deferred_due:
+                    timeout = min(timeout, deferred_due[0] - time.monotonic())
+                await NOTIFY.wait("mail_outbox", timeout=timeout)
+        except Exception as e:
+            logging.exception(f"[DISPATCH] Worker error: {e}")
+            await asyncio.sleep(MAIL_DISPATCH_POLL_SECONDS)
+
+
+async def main():
+    loop_task = asyncio.create_task(mail_dispatch_worker_loop())
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, loop_task.cancel)
+    try:
+        await loop_task
+    except asyncio.CancelledError:
+        logging.info("[DISPATCH] Shutdown requested, no new mail will be claimed")
+    finally:
+        await SEND_POOL.drain(MAIL_DISPATCH_DRAIN_SECONDS)
+        await NOTIFY.close()
+        await SMTP_POOL.close()
+        await POSTGRES.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,136 @@
+import time
+import random
+import argparse
+from utils.matcher import MATCHER, find_match, get_matcher, normalize, MATCHERS
+from utils.fingerprint import NeedleFingerprint
+
+# Compares match engines on synthetic pages: python workers/matcher_benchmark.py --page-words 20000
+
+COMMON_WORDS = (
+    "the of and to in is you that it he was for on are as with his they at be this have from "
+    "or one had by word but not what all were we when your can said there use an each which "
+    "she do how their if will up other about out many then them these so some her would make"
+).split()
+
+
+def build_vocabulary(size: int, rng: random.Random):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    rare = ["".join(rng.choice(letters) for _ in range(rng.randint(3, 9))) for _ in range(size)]
+    return COMMON_WORDS + rare
+
+
+WORDS = build_vocabulary(5000, random.Random(0))
+
+
+def build_page(words: int, needle: str, mutate: float, rng: random.Random) -> str:
+    body = [rng.choice(WORDS) for _ in range(words)]
+    needle_words = needle.split()
+    copied = [
+        rng.choice(WORDS) if rng.random() < mutate else word
+        for word in needle_words
+    ]
+    position = rng.randrange(0, max(1, words - len(copied)))
+    body[position:position] = copied
+    return " ".join(body)
+
+
+def run(engine_name: str, needle: str, pages, threshold: int):
+    matcher = get_matcher(engine_name)
+    started = time.perf_counter()
+    scores = [matcher.score(needle, page) for page in pages]
+    single = time.perf_counter() - started
+
+    started = time.perf_counter()
+    batch_scores = matcher.score_many(needle, pages)
+    batch = time.perf_counter() - started
+
+    matched = sum(score >= threshold for score in scores)
+    return scores, batch_scores, single, batch, matched
+
+
+def run_fingerprint(needle: str, pages, threshold: int):
+    started = time.perf_counter()
+    full_scores = [MATCHER.score(needle, page) for page in pages]
+    full = time.perf_counter() - started
+
+    started = time.perf_counter()
+    fingerprint = NeedleFingerprint(needle)
+    filtered_scores = [find_match(needle, page, fingerprint, threshold)[0] for page in pages]
+    filtered = time.perf_counter() - started
+
+    rejected = sum(not fingerprint.may_match(page.split()) for page in pages)
+    disagreements = sum(
+        (a >= threshold) != (b >= threshold) for a, b in zip(full_scores, filtered_scores)
+    )
+    print(
+        f"fingerprint: {full:8.3f}s full-page scoring, {filtered:8.3f}s shingle-filtered, "
+        f"{rejected}/{len(pages)} pages rejected early, {disagreements} threshold decisions differ"
+    )
+
+
+def run_reworded(threshold: int, rng: random.Random):
+    """
+    A 40-word poem with one letter changed in every third word, quoted on a short page.
+    It scores well above the threshold, so the shingle filter must let it through.
+    """
+    poem = normalize(" ".join(rng.choice(WORDS[len(COMMON_WORDS):]) for _ in range(40)))
+    words = poem.split()
+    for i in range(2, len(words), 3):
+        position = rng.randrange(len(words[i]))
+        replacement = "z" if words[i][position] != "z" else "y"
+        words[i] = words[i][:position] + replacement + words[i][position + 1:]
+    copy = " ".join(words)
+    page = normalize(" ".join(rng.choice(WORDS) for _ in range(20)) + " " + copy + " " +
+                     " ".join(rng.choice(WORDS) for _ in range(20)))
+    fingerprint = NeedleFingerprint(poem)
+    full_score = MATCHER.score(poem, page)
+    filtered_score = find_match(poem, page, fingerprint, threshold)[0]
+    print(
+        f"reworded copy: passes the filter: {fingerprint.may_match(page.split())}, "
+        f"full-page score {full_score}, shingle-filtered score {filtered_score}, "
+        f"threshold decision {'kept' if (full_score >= threshold) == (filtered_score >= threshold) else 'LOST'}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark fuzzy match engines on large pages")
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--page-words", type=int, default=20000)
+    parser.add_argument("--needle-words", type=int, default=60)
+    parser.add_argument("--mutate", type=float, default=0.05, help="Fraction of needle words altered on the page")
+    parser.add_argument("--decoys", type=int, default=80, help="Pages without the protected text")
+    parser.add_argument("--threshold", type=int, default=85)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    needle = normalize(" ".join(rng.choice(WORDS) for _ in range(args.needle_words)))
+    pages = [normalize(build_page(args.page_words, needle, args.mutate, rng)) for _ in range(args.pages)]
+    print(f"{args.pages} pages x {args.page_words} words, needle {len(needle)} chars, threshold {args.threshold}")
+
+    results = {}
+    for engine_name in MATCHERS:
+        scores, batch_scores, single, batch, matched = run(engine_name, needle, pages, args.threshold)
+        results[engine_name] = scores
+        print(
+            f"{engine_name:>10}: {single:8.3f}s one-by-one, {batch:8.3f}s batched, "
+            f"{matched}/{len(pages)} pages >= threshold"
+        )
+
+    reference, candidate = results["fuzzywuzzy"], results["rapidfuzz"]
+    disagreements = sum(
+        (old >= args.threshold) != (new >= args.threshold) for old, new in zip(reference, candidate)
+    )
+    print(f"threshold decisions that differ: {disagreements}/{len(pages)}")
+    print(f"max score difference: {max(abs(a - b) for a, b in zip(reference, candidate))}")
+
+    decoys = [
+        normalize(" ".join(rng.choice(WORDS) for _ in range(args.page_words)))
+        for _ in range(args.decoys)
+    ]
+    run_fingerprint(needle, pages + decoys, args.threshold)
+    run_reworded(args.threshold, rng)
+
+
+if __name__ == "__main__":
+    main()
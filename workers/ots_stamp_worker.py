@@ -0,0 +1,108 @@
+import os
+import asyncio
+import logging
+from utils.postgres import POSTGRES
+
+SHARED_DIR = os.getenv("SHARED_DIR", "/app/shared")
+OTS_BATCH_SIZE = int(os.getenv("OTS_BATCH_SIZE", 50))
+OTS_MAX_ATTEMPTS = int(os.getenv("OTS_MAX_ATTEMPTS", 3))
+OTS_STAMP_TIMEOUT_SECONDS = int(os.getenv("OTS_STAMP_TIMEOUT_SECONDS", 120))
+OTS_POLL_SECONDS = int(os.getenv("OTS_POLL_SECONDS", 10))
+# A failed stamp is retried after OTS_RETRY_BASE_SECONDS, doubling per attempt, so a calendar
+# outage does not burn through OTS_MAX_ATTEMPTS (after which outreach goes out without a proof)
+OTS_RETRY_BASE_SECONDS = int(os.getenv("OTS_RETRY_BASE_SECONDS", 300))
+OTS_RETRY_MAX_SECONDS = int(os.getenv("OTS_RETRY_MAX_SECONDS", 3600))
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+)
+
+
+async def fetch_unstamped_results():
+    return await POSTGRES.fetch_all("""
+        SELECT id, screenshot_path FROM crawl_results
+        WHERE status = 'MATCHED'
+          AND screenshot_path IS NOT NULL
+          AND ots_path IS NULL
+          AND ots_attempts < $1
+          AND ots_next_attempt_at <= now()
+        ORDER BY timestamp ASC
+        LIMIT $2
+    """, (OTS_MAX_ATTEMPTS, OTS_BATCH_SIZE))
+
+
+async def record_failed_attempt(result_ids):
+    await POSTGRES.execute("""
+        UPDATE crawl_results
+        SET ots_attempts = ots_attempts + 1,
+            ots_next_attempt_at = now() + INTERVAL '1 second' * LEAST($2::float8, $3::float8 * 2 ^ ots_attempts)
+        WHERE id = ANY($1::uuid[])
+    """, (list(result_ids), float(OTS_RETRY_MAX_SECONDS), float(OTS_RETRY_BASE_SECONDS)))
+
+
+async def run_ots_stamp(paths):
+    # `ots stamp` builds one merkle tree over all files and makes a single calendar submission
+    proc = await asyncio.create_subprocess_exec("ots", "stamp", *paths)
+    try:
+        await asyncio.wait_for(proc.wait(), timeout=OTS_STAMP_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        raise
+    return proc.returncode
+
+
+async def stamp_batch(rows):
+    missing = [row["id"] for row in rows if not os.path.isfile(row["screenshot_path"])]
+    if missing:
+        logging.warning(f"[OTS] {len(missing)} screenshots missing on disk, skipping them")
+        await record_failed_attempt(missing)
+
+    rows = [row for row in rows if row["id"] not in missing]
+    if not rows:
+        return 0
+
+    paths = [row["screenshot_path"] for row in rows]
+    try:
+        returncode = await run_ots_stamp(paths)
+        if returncode != 0:
+            logging.warning(f"[OTS] ots stamp exited with {returncode} for {len(paths)} files")
+    except Exception as e:
+        logging.exception(f"[OTS] Stamping failed for {len(paths)} files: {e}")
+
+    failed = []
+    for row in rows:
+        default_ots = row["screenshot_path"] + ".ots"
+        if not os.path.isfile(default_ots):
+            failed.append(row["id"])
+            continue
+        base_name = os.path.splitext(os.path.basename(row["screenshot_path"]))[0]
+        ots_path = os.path.join(SHARED_DIR, "ots", f"{base_name}.ots")
+        os.replace(default_ots, ots_path)
+        await POSTGRES.execute("""
+            UPDATE crawl_results SET ots_path = $1 WHERE id = $2
+        """, (ots_path, row["id"]))
+
+    if failed:
+        await record_failed_attempt(failed)
+    logging.info(f"[OTS] Stamped {len(rows) - len(failed)}/{len(rows)} screenshots")
+    return len(rows) - len(failed)
+
+
+async def ots_stamp_worker_loop():
+    logging.info("[OTS] Starting OTS stamping worker...")
+    while True:
+        try:
+            rows = await fetch_unstamped_results()
+            # Go straight on to the next batch only while stamping is working
+            if rows and await stamp_batch(rows):
+                continue
+            await asyncio.sleep(OTS_POLL_SECONDS)
+        except Exception as e:
+            logging.exception(f"[OTS] Worker error: {e}")
+            await asyncio.sleep(OTS_POLL_SECONDS)
+
+
+if __name__ == "__main__":
+    asyncio.run(ots_stamp_worker_loop())
@@ -1,8 +1,13 @@
 import os
+import signal
 import asyncio
 import datetime
 from utils.postgres import POSTGRES  # asyncpg wrapper
-from utils.send_email_with_template import send_email_with_template  # your SMTP function
+from utils.notify import NOTIFY
+from utils.outbox import PENDING_MAIL_FOR_CONTACT
+from utils.worker_pool import WorkerPool
+from utils.send_email_with_template import queue_email_with_template, template_name
+from utils.templates import TEMPLATES
 import logging
 
 logging.basicConfig(
@@ -17,6 +22,14 @@ STATUS_SEQUENCE = [
     ("SENT_3RD_MAIL", "SENT_4TH_MAIL", int(os.getenv("MAIL_4_DELAY_DAYS", 10))),
     ("SENT_4TH_MAIL", "LEGAL_LETTER_READY", int(os.getenv("LEGAL_DELAY_DAYS", 14))),
 ]
+OTS_MAX_ATTEMPTS = int(os.getenv("OTS_MAX_ATTEMPTS", 3))
+OUTREACH_BATCH_SIZE = int(os.getenv("OUTREACH_BATCH_SIZE", 20))
+# A contact still marked is_processing after this long, with no mail queued, belongs to a crashed worker and is claimed again
+OUTREACH_LEASE_MINUTES = int(os.getenv("OUTREACH_LEASE_MINUTES", 15))
+OUTREACH_MAX_IN_FLIGHT = int(os.getenv("OUTREACH_MAX_IN_FLIGHT", 10))
+OUTREACH_DRAIN_SECONDS = int(os.getenv("OUTREACH_DRAIN_SECONDS", 60))
+
+SEND_POOL = WorkerPool("OUTREACH", OUTREACH_MAX_IN_FLIGHT)
 
 
 async def process_contact(contact: dict):
@@ -24,7 +37,11 @@ async def process_contact(contact: dict):
     email = contact["email"]
     logging.info(f"[OUTREACH] Processing contact {contact_id} for email {email}...")
     try:
-        await send_email_with_template(contact)
+        await queue_email_with_template(contact)
+    except asyncio.CancelledError:
+        # Shutdown drain ran out of time: hand the contact straight back instead of waiting out the lease
+        await release_contact(contact_id)
+        raise
     except Exception as e:
         print(f"[ERROR] Failed for {email}: {e}")
         await POSTGRES.execute("""
@@ -34,6 +51,38 @@ async def process_contact(contact: dict):
         """, (contact_id,))
 
 
+async def release_contact(contact_id):
+    await POSTGRES.execute("""
+        UPDATE outreach_contacts SET is_processing = false WHERE id = $1
+    """, (contact_id,))
+
+
+async def claim_contacts(current_status: str, cutoff: datetime.datetime, limit: int):
+    """Claim up to limit due contacts in one statement; SKIP LOCKED keeps replicas apart."""
+    return await POSTGRES.fetch_all(f"""
+        UPDATE outreach_contacts
+        SET is_processing = true, processing_started_at = now()
+        WHERE id IN (
+            SELECT id FROM outreach_contacts
+            WHERE status = $1 AND updated_at <= $2
+              AND (
+                  is_processing = false
+                  OR (processing_started_at < now() - INTERVAL '1 minute' * $4 AND NOT {PENDING_MAIL_FOR_CONTACT})
+              )
+              AND EXISTS (
+                  -- hold mail until the OTS stamp is attached, unless stamping gave up
+                  SELECT 1 FROM crawl_results cr
+                  WHERE cr.id = outreach_contacts.crawl_result_id
+                    AND (cr.ots_path IS NOT NULL OR cr.ots_attempts >= $3)
+              )
+            ORDER BY updated_at ASC
+            LIMIT $5
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING *
+    """, (current_status, cutoff, OTS_MAX_ATTEMPTS, OUTREACH_LEASE_MINUTES, limit))
+
+
 async def outreach_worker_loop():
     logging.info("[OUTREACH] Starting outreach worker loop...")
     while True:
@@ -42,30 +91,33 @@ async def outreach_worker_loop():
         for current_status, next_status, delay_days in STATUS_SEQUENCE:
             cutoff = now - datetime.timedelta(minutes=delay_days)
 
-            contacts = await POSTGRES.fetch_all("""
-                SELECT * FROM outreach_contacts
-                WHERE status = $1 AND updated_at <= $2 AND is_processing = false
-                ORDER BY updated_at ASC
-                LIMIT 20
-            """, (current_status, cutoff))
+            # Backpressure: never claim more than the pool can start, so leases aren't burnt waiting
+            await SEND_POOL.wait_for_slot()
+            contacts = await claim_contacts(current_status, cutoff, min(OUTREACH_BATCH_SIZE, SEND_POOL.available))
             if not contacts:
                 logging.info(f"[OUTREACH] No contacts to process for status {current_status}.")
                 continue
             logging.info(f"[OUTREACH] Processing {len(contacts)} contacts for status {current_status}...")
             for contact in contacts:
-                contact_id = contact["id"]
+                await SEND_POOL.submit(process_contact, contact)
 
-                # Lock the contact
-                await POSTGRES.execute("""
-                    UPDATE outreach_contacts
-                    SET is_processing = true
-                    WHERE id = $1
-                """, (contact_id,))
+        # Delays are time based, so keep polling; new and released contacts wake us early
+        await NOTIFY.wait("outreach_contacts", timeout=30)
 
-                asyncio.create_task(process_contact(contact))
 
-        await asyncio.sleep(30)  # sleep for 5 minutes
+async def main():
+    # Fail before claiming anything if a stage's template is missing or broken
+    TEMPLATES.validate(required=[template_name(next_status) for _, next_status, _ in STATUS_SEQUENCE])
+    loop_task = asyncio.create_task(outreach_worker_loop())
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, loop_task.cancel)
+    try:
+        await loop_task
+    except asyncio.CancelledError:
+        logging.info("[OUTREACH] Shutdown requested, no new contacts will be claimed")
+    finally:
+        await SEND_POOL.drain(OUTREACH_DRAIN_SECONDS)
+        await NOTIFY.close()
 
 
 if __name__ == "__main__":
-    asyncio.run(outreach_worker_loop())
+    asyncio.run(main())
@@ -0,0 +1,70 @@
+import os
+import json
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Offline stand-in for the Serper API. Point SERPER_API_URL at http://localhost:<port>/search
+SERPER_STUB_PORT = int(os.getenv("SERPER_STUB_PORT", 8089))
+# Optional JSON file mapping a query to its result links; unknown queries get generated links
+SERPER_STUB_RESULTS = os.getenv("SERPER_STUB_RESULTS")
+SERPER_STUB_PAGES = int(os.getenv("SERPER_STUB_PAGES", 2))
+SERPER_STUB_RESULTS_PER_PAGE = 10
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+)
+
+
+def load_fixtures():
+    if not SERPER_STUB_RESULTS:
+        return {}
+    with open(SERPER_STUB_RESULTS, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+FIXTURES = load_fixtures()
+
+
+def stub_links(query: str, page: int):
+    if query in FIXTURES:
+        links = FIXTURES[query]
+        start = (page - 1) * SERPER_STUB_RESULTS_PER_PAGE
+        return links[start:start + SERPER_STUB_RESULTS_PER_PAGE]
+    if page > SERPER_STUB_PAGES:
+        return []
+    return [
+        f"https://example{i}.com/page-{page}"
+        for i in range(1, SERPER_STUB_RESULTS_PER_PAGE + 1)
+    ]
+
+
+class SerperStubHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        query = payload.get("q", "")
+        page = int(payload.get("page", 1))
+        organic = [
+            {"title": link, "link": link, "position": position}
+            for position, link in enumerate(stub_links(query, page), start=1)
+        ]
+        body = json.dumps({"searchParameters": payload, "organic": organic}).encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.info(f"[SERPER STUB] {format % args}")
+
+
+if __name__ == "__main__":
+    server = ThreadingHTTPServer(("0.0.0.0", SERPER_STUB_PORT), SerperStubHandler)
+    logging.info(f"[SERPER STUB] Listening on port {SERPER_STUB_PORT}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logging.info("[SERPER STUB] Shutting down.")
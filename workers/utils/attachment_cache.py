@@ -0,0 +1,214 @@
+import os
+import io
+import base64
+import hashlib
+import logging
+import time
+import threading
+from collections import OrderedDict
+from email.message import EmailMessage, MIMEPart
+from typing import Optional, Tuple
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; without it screenshots are always attached as captured
+    Image = None
+
+SHARED_DIR = os.getenv("SHARED_DIR", "/app/shared")
+ATTACHMENT_CACHE_DIR = os.getenv("ATTACHMENT_CACHE_DIR", os.path.join(SHARED_DIR, "attachment_cache"))
+ATTACHMENT_CACHE_MAX_BYTES = int(os.getenv("ATTACHMENT_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+# Spilled bodies on disk: least recently used go first past the size limit, any past the age limit
+ATTACHMENT_CACHE_DISK_MAX_BYTES = int(os.getenv("ATTACHMENT_CACHE_DISK_MAX_BYTES", 1024 * 1024 * 1024))
+ATTACHMENT_CACHE_MAX_AGE_DAYS = float(os.getenv("ATTACHMENT_CACHE_MAX_AGE_DAYS", 30))
+ATTACHMENT_CACHE_EVICT_EVERY = int(os.getenv("ATTACHMENT_CACHE_EVICT_EVERY", 50))
+# Remembered file hashes, so unchanged files are not re-hashed
+ATTACHMENT_HASH_MEMO_ENTRIES = int(os.getenv("ATTACHMENT_HASH_MEMO_ENTRIES", 10000))
+# "original", "compressed" (JPEG at full size) or "thumbnail"; needs Pillow, else "original"
+ATTACHMENT_SCREENSHOT_VARIANT = os.getenv("ATTACHMENT_SCREENSHOT_VARIANT", "original")
+ATTACHMENT_THUMBNAIL_WIDTH = int(os.getenv("ATTACHMENT_THUMBNAIL_WIDTH", 800))
+ATTACHMENT_JPEG_QUALITY = int(os.getenv("ATTACHMENT_JPEG_QUALITY", 80))
+
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def encode_base64(data: bytes) -> str:
+    # Same line length as the email package's own base64 body encoding
+    return base64.encodebytes(data).decode("ascii")
+
+
+def render_variant(path: str, variant: str) -> bytes:
+    with Image.open(path) as image:
+        image = image.convert("RGB")
+        if variant == "thumbnail" and image.width > ATTACHMENT_THUMBNAIL_WIDTH:
+            height = round(image.height * ATTACHMENT_THUMBNAIL_WIDTH / image.width)
+            image = image.resize((ATTACHMENT_THUMBNAIL_WIDTH, height))
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=ATTACHMENT_JPEG_QUALITY, optimize=True)
+        return buffer.getvalue()
+
+
+class AttachmentCache:
+    """
+    Base64 bodies of attachment files, keyed by content hash (plus variant), so a screenshot
+    sent in every step of a sequence is read and encoded once. Recently used bodies stay in
+    memory up to max_bytes; older ones spill to disk and are read back as-is. The disk copy
+    is trimmed like the page cache: by age, then least recently used past disk_max_bytes.
+    Thread-safe, since messages are built off the event loop.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = ATTACHMENT_CACHE_DIR,
+        max_bytes: int = ATTACHMENT_CACHE_MAX_BYTES,
+        disk_max_bytes: int = ATTACHMENT_CACHE_DISK_MAX_BYTES,
+        max_age_days: float = ATTACHMENT_CACHE_MAX_AGE_DAYS,
+    ):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.disk_max_bytes = disk_max_bytes
+        self.max_age_seconds = max_age_days * 86400
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._memory_bytes = 0
+        # (path, size, mtime_ns) -> sha256, least recently used first
+        self._hashes: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+        self._spills = 0
+        self._lock = threading.Lock()
+
+    def _file_hash(self, path: str) -> str:
+        stat = os.stat(path)
+        key = (path, stat.st_size, stat.st_mtime_ns)
+        digest = self._hashes.get(key)
+        if digest is None:
+            digest = file_sha256(path)
+            self._hashes[key] = digest
+            if len(self._hashes) > ATTACHMENT_HASH_MEMO_ENTRIES:
+                self._hashes.popitem(last=False)
+        else:
+            self._hashes.move_to_end(key)
+        return digest
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.b64")
+
+    def _remember(self, key: str, encoded: str):
+        self._memory[key] = encoded
+        self._memory_bytes += len(encoded)
+        while self._memory_bytes > self.max_bytes and len(self._memory) > 1:
+            evicted_key, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self._spill(evicted_key, evicted)
+
+    def _spill(self, key: str, encoded: str):
+        path = self._disk_path(key)
+        if os.path.exists(path):
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="ascii") as f:
+                f.write(encoded)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.warning(f"[ATTACHMENTS] Could not spill {key} to disk: {e}")
+            return
+        self._spills += 1
+        if self._spills % ATTACHMENT_CACHE_EVICT_EVERY == 0:
+            self._evict()
+
+    def _evict(self):
+        entries = []
+        now = time.time()
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if now - stat.st_mtime > self.max_age_seconds:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            else:
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        if total <= self.disk_max_bytes:
+            return
+        entries.sort()
+        evicted = 0
+        for _, size, path in entries:
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+        logging.info(f"[ATTACHMENTS] Evicted {evicted} least recently used bodies from disk")
+
+    def _read_spilled(self, key: str) -> Optional[str]:
+        disk_path = self._disk_path(key)
+        try:
+            with open(disk_path, "r", encoding="ascii") as f:
+                encoded = f.read()
+            # Reads count as use for disk eviction
+            os.utime(disk_path)
+        except OSError:
+            return None
+        return encoded
+
+    def encoded(self, path: str, variant: str = "original") -> Tuple[str, str]:
+        """(base64 body, content hash key) for path, encoding it only on first use."""
+        with self._lock:
+            key = self._file_hash(path) if variant == "original" else f"{self._file_hash(path)}-{variant}"
+            encoded = self._memory.get(key)
+            if encoded is not None:
+                self._memory.move_to_end(key)
+                return encoded, key
+
+            encoded = self._read_spilled(key)
+            if encoded is None:
+                if variant == "original":
+                    with open(path, "rb") as f:
+                        encoded = encode_base64(f.read())
+                else:
+                    encoded = encode_base64(render_variant(path, variant))
+            self._remember(key, encoded)
+            return encoded, key
+
+    def part(self, path: str, filename: str, mime_type: str) -> MIMEPart:
+        """A ready-to-attach MIME part whose body comes from the cache."""
+        encoded = None
+        if mime_type.startswith("image/") and ATTACHMENT_SCREENSHOT_VARIANT != "original" and Image is not None:
+            try:
+                encoded, _ = self.encoded(path, ATTACHMENT_SCREENSHOT_VARIANT)
+                mime_type = "image/jpeg"
+                filename = f"{os.path.splitext(filename)[0]}.jpg"
+            except Exception as e:
+                logging.warning(f"[ATTACHMENTS] Sending {path} as captured, {ATTACHMENT_SCREENSHOT_VARIANT} failed: {e}")
+        if encoded is None:
+            encoded, _ = self.encoded(path)
+        part = MIMEPart()
+        part["Content-Type"] = mime_type
+        part["Content-Transfer-Encoding"] = "base64"
+        part.add_header("Content-Disposition", "attachment", filename=filename)
+        part.set_payload(encoded)
+        return part
+
+
+ATTACHMENT_CACHE = AttachmentCache()
+
+
+def attach_cached(msg: EmailMessage, path: str, filename: str, mime_type: str):
+    if not msg.is_multipart():
+        msg.make_mixed()
+    msg.attach(ATTACHMENT_CACHE.part(path, filename, mime_type))
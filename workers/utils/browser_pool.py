@@ -0,0 +1,155 @@
+import os
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import List, Optional
+from playwright.async_api import async_playwright, Browser, BrowserContext, Playwright
+
+BROWSER_MAX_PAGES = int(os.getenv("BROWSER_MAX_PAGES", 4))
+BROWSER_MAX_IDLE_CONTEXTS = int(os.getenv("BROWSER_MAX_IDLE_CONTEXTS", BROWSER_MAX_PAGES))
+BROWSER_CONTEXT_MAX_NAVIGATIONS = int(os.getenv("BROWSER_CONTEXT_MAX_NAVIGATIONS", 50))
+BROWSER_MAX_NAVIGATIONS = int(os.getenv("BROWSER_MAX_NAVIGATIONS", 500))
+
+
+class BROWSER:
+    """
+    Long-lived Chromium shared by every scan in the crawl worker.
+
+    Pages are leased through `BROWSER.page()`; at most BROWSER_MAX_PAGES are open at once.
+    Contexts are reused between leases and recycled after BROWSER_CONTEXT_MAX_NAVIGATIONS,
+    the browser itself is relaunched after BROWSER_MAX_NAVIGATIONS or if it crashes.
+    Once a relaunch is due no new leases are handed out, so the browser drains and is
+    relaunched even under sustained load.
+    """
+    _playwright: Optional[Playwright] = None
+    _browser: Optional[Browser] = None
+    _idle_contexts: List[BrowserContext] = []
+    _context_navigations: dict = {}
+    _navigations: int = 0
+    _in_use: int = 0
+    _recycle_pending: bool = False
+    _semaphore: Optional[asyncio.Semaphore] = None
+    _lock: Optional[asyncio.Lock] = None
+    # Shares _lock; notified when the last lease is released
+    _drained: Optional[asyncio.Condition] = None
+
+    @classmethod
+    async def init(cls):
+        if cls._lock is None:
+            cls._lock = asyncio.Lock()
+            cls._drained = asyncio.Condition(cls._lock)
+            cls._semaphore = asyncio.Semaphore(BROWSER_MAX_PAGES)
+        async with cls._lock:
+            if cls._playwright is None:
+                cls._playwright = await async_playwright().start()
+            if not cls.is_healthy():
+                await cls._launch()
+
+    @classmethod
+    async def close(cls):
+        if cls._lock is None:
+            return
+        async with cls._lock:
+            await cls._close_browser()
+            if cls._playwright is not None:
+                await cls._playwright.stop()
+                cls._playwright = None
+
+    @classmethod
+    def is_healthy(cls) -> bool:
+        return cls._browser is not None and cls._browser.is_connected()
+
+    @classmethod
+    async def _launch(cls):
+        await cls._close_browser()
+        logging.info("[BROWSER] Launching Chromium...")
+        cls._browser = await cls._playwright.chromium.launch(headless=True)
+        cls._browser.on("disconnected", lambda _: logging.warning("[BROWSER] Chromium disconnected"))
+        cls._navigations = 0
+        cls._recycle_pending = False
+
+    @classmethod
+    async def _close_browser(cls):
+        contexts, cls._idle_contexts = cls._idle_contexts, []
+        cls._context_navigations = {}
+        for context in contexts:
+            await cls._close_quietly(context)
+        if cls._browser is not None:
+            await cls._close_quietly(cls._browser)
+            cls._browser = None
+
+    @staticmethod
+    async def _close_quietly(target):
+        try:
+            await target.close()
+        except Exception as e:
+            logging.debug(f"[BROWSER] Ignoring close error: {e}")
+
+    @classmethod
+    async def _acquire_context(cls) -> BrowserContext:
+        async with cls._drained:
+            # A pending recycle stops new leases until the ones in flight come back
+            await cls._drained.wait_for(lambda: not cls._recycle_pending or cls._in_use == 0)
+            if not cls.is_healthy() or cls._recycle_pending:
+                await cls._launch()
+            cls._in_use += 1
+            if cls._idle_contexts:
+                return cls._idle_contexts.pop()
+            context = await cls._browser.new_context()
+            cls._context_navigations[id(context)] = 0
+            return context
+
+    @classmethod
+    async def _release_context(cls, context: BrowserContext, healthy: bool):
+        async with cls._drained:
+            cls._in_use -= 1
+            if cls._in_use == 0:
+                cls._drained.notify_all()
+            navigations = cls._context_navigations.get(id(context), 0)
+            reusable = (
+                healthy
+                and cls.is_healthy()
+                and not cls._recycle_pending
+                and navigations < BROWSER_CONTEXT_MAX_NAVIGATIONS
+                and len(cls._idle_contexts) < BROWSER_MAX_IDLE_CONTEXTS
+            )
+            if reusable:
+                try:
+                    await context.clear_cookies()
+                    cls._idle_contexts.append(context)
+                    return
+                except Exception:
+                    pass
+            cls._context_navigations.pop(id(context), None)
+            await cls._close_quietly(context)
+
+    @classmethod
+    def _count_navigation(cls, context: BrowserContext, frame):
+        if frame.parent_frame is not None:
+            return
+        cls._navigations += 1
+        key = id(context)
+        cls._context_navigations[key] = cls._context_navigations.get(key, 0) + 1
+        if cls._navigations >= BROWSER_MAX_NAVIGATIONS and not cls._recycle_pending:
+            logging.info(f"[BROWSER] {cls._navigations} navigations served, recycling browser once in-flight pages finish")
+            cls._recycle_pending = True
+
+    @classmethod
+    @asynccontextmanager
+    async def page(cls):
+        await cls.init()
+        async with cls._semaphore:
+            context = await cls._acquire_context()
+            healthy = True
+            page = None
+            try:
+                page = await context.new_page()
+                page.on("framenavigated", lambda frame: cls._count_navigation(context, frame))
+                yield page
+            except Exception:
+                healthy = page is not None and not page.is_closed() and cls.is_healthy()
+                raise
+            finally:
+                if page is not None and not page.is_closed():
+                    await cls._close_quietly(page)
+                await cls._release_context(context, healthy)
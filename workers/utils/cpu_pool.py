@@ -0,0 +1,148 @@
+import os
+import time
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional
+
+# 0 runs CPU-bound text work inline on the event loop
+CPU_POOL_WORKERS = int(os.getenv("CPU_POOL_WORKERS", os.cpu_count() or 1))
+CPU_POOL_BATCH_SIZE = int(os.getenv("CPU_POOL_BATCH_SIZE", 8))
+CPU_POOL_BATCH_WAIT_MS = float(os.getenv("CPU_POOL_BATCH_WAIT_MS", 5))
+CPU_POOL_METRICS_INTERVAL_SECONDS = int(os.getenv("CPU_POOL_METRICS_INTERVAL_SECONDS", 60))
+
+# Read-mostly state (e.g. the watchlist index) installed once per worker process instead of per call
+_shared: Dict[str, Any] = {}
+
+
+def _init_worker(shared: Dict[str, Any]):
+    _shared.clear()
+    _shared.update(shared)
+
+
+def get_shared(name: str):
+    return _shared.get(name)
+
+
+def _run_batch(calls):
+    results = []
+    for fn, args in calls:
+        try:
+            results.append((True, fn(*args)))
+        except Exception as e:
+            results.append((False, e))
+    return results
+
+
+class CPU_POOL:
+    """
+    Process pool for normalization and scoring. Calls made within CPU_POOL_BATCH_WAIT_MS of
+    each other are sent to a worker process together, up to CPU_POOL_BATCH_SIZE per batch.
+    """
+    _executor: Optional[ProcessPoolExecutor] = None
+    _pending: list = []
+    _flush_handle: Optional[asyncio.TimerHandle] = None
+    _in_flight: int = 0
+    _completed: int = 0
+    _batches: int = 0
+    _last_metrics_log: float = 0.0
+
+    @classmethod
+    def init(cls):
+        if cls._executor is None and CPU_POOL_WORKERS > 0:
+            cls._executor = ProcessPoolExecutor(
+                max_workers=CPU_POOL_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(dict(_shared),),
+            )
+
+    @classmethod
+    def close(cls):
+        if cls._executor is not None:
+            cls._executor.shutdown(wait=False, cancel_futures=True)
+            cls._executor = None
+
+    @classmethod
+    def set_shared(cls, name: str, value):
+        _shared[name] = value
+        if cls._executor is not None:
+            # Worker processes only receive shared state at start-up; in-flight batches finish on the old pool
+            old_executor, cls._executor = cls._executor, None
+            old_executor.shutdown(wait=False)
+            cls.init()
+
+    @classmethod
+    def metrics(cls) -> dict:
+        return {
+            "workers": CPU_POOL_WORKERS,
+            "queued": len(cls._pending),
+            "in_flight": cls._in_flight,
+            "queue_depth": len(cls._pending) + cls._in_flight,
+            "completed": cls._completed,
+            "batches": cls._batches,
+        }
+
+    @classmethod
+    async def run(cls, fn, *args):
+        if CPU_POOL_WORKERS <= 0:
+            return fn(*args)
+        cls.init()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        cls._pending.append((fn, args, future))
+        if len(cls._pending) >= CPU_POOL_BATCH_SIZE:
+            cls._flush()
+        elif cls._flush_handle is None:
+            cls._flush_handle = loop.call_later(CPU_POOL_BATCH_WAIT_MS / 1000, cls._flush)
+        return await future
+
+    @classmethod
+    def _flush(cls):
+        if cls._flush_handle is not None:
+            cls._flush_handle.cancel()
+            cls._flush_handle = None
+        batch, cls._pending = cls._pending, []
+        if not batch:
+            return
+
+        futures = [future for _, _, future in batch]
+        cls._in_flight += len(batch)
+        cls._batches += 1
+        try:
+            submitted = asyncio.wrap_future(
+                cls._executor.submit(_run_batch, [(fn, args) for fn, args, _ in batch])
+            )
+        except Exception as e:
+            cls._finish(futures, None, e)
+            return
+        submitted.add_done_callback(lambda done: cls._finish(futures, done, None))
+        cls._log_metrics()
+
+    @classmethod
+    def _finish(cls, futures, done, error):
+        cls._in_flight -= len(futures)
+        cls._completed += len(futures)
+        if error is None and not done.cancelled() and done.exception() is not None:
+            error = done.exception()
+        if error is None and done.cancelled():
+            error = asyncio.CancelledError()
+        for i, future in enumerate(futures):
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+                continue
+            ok, value = done.result()[i]
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    @classmethod
+    def _log_metrics(cls):
+        now = time.monotonic()
+        if now - cls._last_metrics_log >= CPU_POOL_METRICS_INTERVAL_SECONDS:
+            cls._last_metrics_log = now
+            logging.info(f"[CPU POOL] {cls.metrics()}")
@@ -1,41 +1,37 @@
 import os
 import re
+import asyncio
 import json
-import requests
 import logging
-import subprocess
 from pathlib import Path
 from urllib.parse import urlparse
 import re
-import requests
-import whois
 from validate_email_address import validate_email
 from typing import List
 from utils.postgres import POSTGRES
 import uuid
 import datetime
 import logging
-from playwright.async_api import async_playwright
-from fuzzywuzzy import fuzz
 from urllib.parse import urlparse
-from utils.send_mail import send_email
+from utils.outbox import outbox_insert
+from utils.browser_pool import BROWSER
+from utils.scan_scheduler import SCHEDULER
+from utils.http_fetch import HTTP, fetch_page, PAGE_TEXT_MAX_CHARS
+from utils.page_readiness import wait_until_ready
+from utils.whois_cache import get_whois_emails
+from utils.search_client import search_google
+from utils.page_cache import PAGE_CACHE, normalize_url
+from utils.matcher import match_page_in_pool, normalize
+from utils.cpu_pool import CPU_POOL
+from utils.fingerprint import NeedleFingerprint
+from utils.watchlist import WATCHLIST, WATCHLIST_MODE
+from utils.screenshots import capture_screenshot
 
 
 from utils.postgres import POSTGRES
 
-SERPER_API_KEY = os.getenv("SERPER_API_KEY")
-SERPER_API_URL = os.getenv("SERPER_API_URL")
-
 SHARED_DIR = os.getenv("SHARED_DIR", "/app/shared")
 
-def search_google(query, page=1, max_results=100):
-    headers = {"X-API-KEY": SERPER_API_KEY}
-    payload = {"q": query, "page": page}
-    response = requests.post(SERPER_API_URL, json=payload, headers=headers)
-    # logging.info(response.text)
-    results = response.json().get("organic", [])[:max_results]
-    return [r["link"] for r in results if "link" in r]
-
 def extract_domain(url):
     return urlparse(url).netloc.lower()
 
@@ -49,12 +45,6 @@ def include_filter(url, include, exclude):
         return False
     return True
 
-def normalize(text):
-    text = text.lower()
-    text = re.sub(r'\s+', ' ', text)
-    text = re.sub(r'[^\w\s]', '', text)
-    return text.strip()
-
 STANDARD_EMAIL_PREFIXES = [
     "contact", "info", "admin", "support", "legal",
     "webmaster", "help", "hello", "team"
@@ -69,12 +59,12 @@ def guess_standard_emails(domain: str):
         domain = domain[5:]
     return [f"{prefix}@{domain}" for prefix in STANDARD_EMAIL_PREFIXES]
 
+EMAIL_PATTERN = re.compile(r"[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+")
+MAILTO_PATTERN = re.compile(r"mailto:([a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+)")
+
 def extract_emails_from_html(html: str):
-    email_pattern = r"[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+"
-    mailto_pattern = r"mailto:([a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+)"
-    
-    emails = set(re.findall(email_pattern, html))
-    emails.update(re.findall(mailto_pattern, html))
+    emails = set(EMAIL_PATTERN.findall(html))
+    emails.update(MAILTO_PATTERN.findall(html))
     
     return list(emails)
 
@@ -106,31 +96,82 @@ async def save_outreach_contacts(job_id: str, crawl_result_id: str, emails: List
 
     await POSTGRES.execute_transaction_with_results(queries)
 
-async def extract_possible_emails(page, url:str, content: str, job_id:str, crawl_result_id: str, test_email:str):
+CONTACT_PAGE_SUFFIXES = [
+    "/contact", "/about", "/privacy-policy", "/terms", "/legal",
+    "/contact-us", "/support", "/help", "/team", "/reach-us", "/connect"
+]
+
+def bare_domain(domain: str) -> str:
+    domain = domain.lower().split(":")[0]
+    return domain[4:] if domain.startswith("www.") else domain
+
+def is_high_confidence_email(email: str, domain: str) -> bool:
+    # An address published on the site under the site's own domain
+    email_domain = email.lower().rsplit("@", 1)[-1]
+    site = bare_domain(domain)
+    return email_domain == site or email_domain.endswith("." + site)
+
+async def subpage_exists(sub_url: str) -> bool:
+    try:
+        response = await HTTP.head(sub_url)
+        return response.status_code not in (404, 410)
+    except Exception:
+        # HEAD unsupported or flaky: let the real fetch decide
+        return True
+
+async def fetch_subpage_emails(sub_url: str, crawl_options: dict = None) -> List[str]:
+    fetched = await fetch_page(sub_url, use_cache=False, keep_html=True)
+    if fetched and fetched["status"] is not None and 400 <= fetched["status"] < 500:
+        # A missing or forbidden subpage is not worth a browser page
+        return []
+    if fetched and not fetched["needs_js"]:
+        return extract_emails_from_html(fetched["html"])
+    async with BROWSER.page() as page:
+        await page.goto(sub_url, timeout=10000, wait_until="domcontentloaded")
+        await wait_until_ready(page, crawl_options)
+        return extract_emails_from_html(await page.content())
+
+async def discover_contact_page_emails(domain: str, crawl_options: dict = None) -> set:
+    # Probes share the domain's probe slots in SCHEDULER, so a site sees a few requests at a time
+    sub_urls = [f"https://{domain}{suffix}" for suffix in CONTACT_PAGE_SUFFIXES]
+    exists = await asyncio.gather(*(SCHEDULER.probe(sub_url, subpage_exists) for sub_url in sub_urls))
+    sub_urls = [sub_url for sub_url, ok in zip(sub_urls, exists) if ok]
+
+    async def fetch_emails(sub_url):
+        return await fetch_subpage_emails(sub_url, crawl_options)
+
+    emails = set()
+    tasks = {asyncio.create_task(SCHEDULER.probe(sub_url, fetch_emails)): sub_url for sub_url in sub_urls}
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                found = await next_done
+            except Exception as e:
+                logging.warning(f"Failed to fetch subpage on {domain}: {e}")
+                continue
+            emails.update(found)
+            if any(is_high_confidence_email(email, domain) for email in found):
+                logging.info(f"[CRAWLER] High-confidence contact found on {domain}, skipping remaining subpages")
+                break
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return emails
+
+async def extract_possible_emails(url:str, page_emails: List[str], matched_results: List[dict], crawl_options: dict = None):
+    """Discover contacts for the matched page once, then save them for every job that matched it."""
     parsed = urlparse(url)
     domain = parsed.netloc
     possible_emails = set()
-    possible_emails.update(extract_emails_from_html(content))
+    possible_emails.update(page_emails)
 
-    for suffix in ["/contact", "/about", "/privacy-policy", "/terms", "/legal",
-    "/contact-us", "/support", "/help", "/team", "/reach-us", "/connect"]:
-        sub_url = f"https://{domain}{suffix}"
-        try:
-            await page.goto(sub_url, timeout=10000)
-            await page.wait_for_timeout(2000)
-            sub_html = await page.content()
-            possible_emails.update(extract_emails_from_html(sub_html))
-        except Exception as e:
-            logging.warning(f"Failed to fetch subpage {sub_url}: {e}")
-            continue
+    if not any(is_high_confidence_email(email, domain) for email in possible_emails):
+        possible_emails.update(await discover_contact_page_emails(domain, crawl_options))
 
     # 3. WHOIS fallback
     try:
-        whois_info = whois.whois(domain)
-        if isinstance(whois_info.emails, list):
-            possible_emails.update(whois_info.emails)
-        elif whois_info.emails:
-            possible_emails.add(whois_info.emails)
+        possible_emails.update(await get_whois_emails(domain))
     except Exception:
         pass
 
@@ -142,62 +183,110 @@ async def extract_possible_emails(page, url:str, content: str, job_id:str, crawl
     #     logging.info(f"Found {len(working_emails)} valid emails")
     # else:
     #     logging.info(f"No valid emails found")
-    await save_outreach_contacts(
-        job_id=job_id,
-        crawl_result_id=crawl_result_id,
-        # emails=working_emails
-        emails=[test_email]
-    )
-
-async def scan_url_for_text(job_id, ip_text, url, test_email, threshold=85):
-    normalized_ip = normalize(ip_text)
-    match_data = None
-
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        page = await browser.new_page()
-        try:
-            await page.goto(url, timeout=15000)
-            await page.wait_for_timeout(3000)
-            content = await page.content()  # Full HTML content
-            visible_text = await page.text_content("body") or ""
-            normalized_content = normalize(visible_text)
-            score = fuzz.partial_ratio(normalized_ip, normalized_content)
-
-            if score >= threshold:
-                logging.info(f"✅ Match found! URL: {url}, Score: {score}")
-                timestamp = datetime.datetime.now(datetime.timezone.utc)
-                base_name = f"screenshot_{timestamp.strftime('%Y%m%d_%H%M%S')}"
+    for result in matched_results:
+        await save_outreach_contacts(
+            job_id=result["job_id"],
+            crawl_result_id=result["crawl_result_id"],
+            # emails=working_emails
+            emails=[result["test_email"]]
+        )
 
-                image_path = os.path.join(SHARED_DIR, "images" f"{base_name}.png")
-                ots_path = os.path.join(SHARED_DIR, "ots", f"{base_name}.ots")
+async def is_already_matched(job_id, url) -> bool:
+    row = await POSTGRES.fetch_one("""
+        SELECT 1 FROM crawl_results WHERE job_id = $1 AND url = $2 AND status = 'MATCHED' LIMIT 1
+    """, (job_id, url))
+    return row is not None
+
+def allowed_matches(url: str, matches: list, needles_by_job: dict) -> list:
+    """Drop watchlist matches for jobs whose include/exclude domain filters reject url."""
+    allowed = []
+    for match in matches:
+        needle = needles_by_job[str(match["job_id"])]
+        if include_filter(url, needle.get("include_domains"), needle.get("exclude_domains")):
+            allowed.append(match)
+    return allowed
+
+async def scan_url_for_text(job_id, ip_text, url, test_email, threshold=85, crawl_options=None):
+    """
+    Scan one URL for the job's text and, in watchlist mode, for every other protected text.
+    Returns True when the job's own text matched.
+    """
+    needle = {
+        "job_id": job_id,
+        "fingerprint": NeedleFingerprint(normalize(ip_text)),
+        "test_email": test_email,
+    }
+    needles_by_job = {str(job_id): needle}
+    watchlist = await WATCHLIST.get() if WATCHLIST_MODE else None
+    if watchlist is not None:
+        needles_by_job.update(watchlist.needles)
+        needles_by_job[str(job_id)] = needle
+    matched_results = []
+    own_match = False
+
+    # Cheap HTTP tier first: only matches and client-rendered pages reach the browser
+    fetched = await fetch_page(url)
+    if fetched and not fetched["needs_js"]:
+        matches = await CPU_POOL.run(match_page_in_pool, fetched["text"], [needle], threshold, watchlist is not None)
+        matches = allowed_matches(url, matches, needles_by_job)
+        if not matches:
+            return False
+        logging.info(f"[CRAWLER] HTTP tier matched {url} for {len(matches)} job(s), rendering for evidence")
+
+    async with BROWSER.page() as page:
+        try:
+            await page.goto(url, timeout=15000, wait_until="domcontentloaded")
+            await wait_until_ready(page, crawl_options)
+            # Truncated in the page so a huge body never crosses into the worker whole
+            visible_text = await page.evaluate(
+                "max => (document.body ? document.body.textContent : '').slice(0, max)",
+                PAGE_TEXT_MAX_CHARS,
+            )
+            await PAGE_CACHE.put(url, visible_text, rendered=True)
+            matches = await CPU_POOL.run(match_page_in_pool, visible_text, [needle], threshold, watchlist is not None)
+            del visible_text
+            own_match = any(str(match["job_id"]) == str(job_id) for match in matches)
+            matches = allowed_matches(url, matches, needles_by_job)
+            # A job that already has this URL on record (including the job itself, when a
+            # reclaimed event is crawled again) gets no second result, screenshot or outreach
+            matches = [match for match in matches if not await is_already_matched(match["job_id"], url)]
+
+            if matches:
+                # The full HTML is only needed for contact emails, so only matched pages pay for it
+                page_emails = extract_emails_from_html(await page.content())
 
-                await page.screenshot(path=image_path, full_page=True)
-                
-                subprocess.run(["ots", "stamp", image_path])
-                default_ots = image_path + ".ots"
-                os.replace(default_ots, ots_path)
-                
-                snippet_start = normalized_content.find(normalized_ip[:10])
-                snippet = normalized_content[snippet_start:snippet_start + 200]
+                timestamp = datetime.datetime.now(datetime.timezone.utc)
+                # OTS stamping happens later in ots_stamp_worker, which fills in ots_path
+                screenshot = await capture_screenshot(page, url, timestamp)
 
+            for match in matches:
+                matched_job_id = match["job_id"]
+                logging.info(f"✅ Match found! URL: {url}, Score: {match['score']}, job_id={matched_job_id}")
                 match_data = {
                     "url": url,
-                    "match_score": score,
-                    "matched_snippet": snippet,
+                    "match_score": match["score"],
+                    "matched_snippet": match["snippet"],
+                    "match_start": match["match_start"],
+                    "match_end": match["match_end"],
+                    "match_norm_start": match["match_norm_start"],
+                    "match_norm_end": match["match_norm_end"],
                     "timestamp": timestamp,
-                    "screenshot": image_path,
-                    "ots_path": ots_path,
+                    "screenshot": screenshot["path"],
+                    "screenshot_sha256": screenshot["sha256"],
+                    "preview_path": screenshot["preview_path"],
+                    "ots_path": None,
                     "status": "MATCHED"
                 }
 
                 crawl_result_id = await save_crawl_result(
-                    job_id=job_id,
+                    job_id=matched_job_id,
                     result=match_data
                 )
-
-                await extract_possible_emails(page, url, content, job_id, crawl_result_id, test_email)
-                return True
+                matched_results.append({
+                    "job_id": matched_job_id,
+                    "crawl_result_id": crawl_result_id,
+                    "test_email": needles_by_job[str(matched_job_id)]["test_email"],
+                })
 
         except Exception as e:
             logging.error(f"[CRAWL ERROR] {url} => {e}")
@@ -211,14 +300,24 @@ async def scan_url_for_text(job_id, ip_text, url, test_email, threshold=85):
                 "ots_path": None
             }
             await save_crawl_result(job_id, error_data)
-        return False
+
+    if not matched_results:
+        return own_match
+
+    # Runs after the page is released so subpage probes can lease their own pages
+    try:
+        await extract_possible_emails(url, page_emails, matched_results, crawl_options)
+    except Exception as e:
+        logging.exception(f"[CRAWLER] Contact discovery failed for {url}: {e}")
+    return own_match
 
 async def save_crawl_result(job_id, result):
     query = """
         INSERT INTO crawl_results (
             job_id, url, matched_snippet, match_score,
-            screenshot_path, ots_path, timestamp, status
-        ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+            screenshot_path, screenshot_sha256, preview_path, ots_path, timestamp, status,
+            match_start, match_end, match_norm_start, match_norm_end
+        ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14)
         RETURNING id
     """
     args = [
@@ -227,9 +326,15 @@ async def save_crawl_result(job_id, result):
         result.get("matched_snippet"),
         result.get("match_score"),
         result.get("screenshot"),
+        result.get("screenshot_sha256"),
+        result.get("preview_path"),
         result.get("ots_path"),
         result["timestamp"],
-        result["status"]
+        result["status"],
+        result.get("match_start"),
+        result.get("match_end"),
+        result.get("match_norm_start"),
+        result.get("match_norm_end"),
     ]
 
     # Wrap the single insert query in a list
@@ -239,7 +344,7 @@ async def save_crawl_result(job_id, result):
     
     return results[0]['id'] 
 
-async def crawler_fun(job_id, event_id):
+async def crawler_fun(job_id):
     logger = logging.getLogger("crawler")
     logger.info(f"[CRAWLER] Starting crawl for job_id={job_id}")
 
@@ -254,52 +359,69 @@ async def crawler_fun(job_id, event_id):
     """, [job_id])
     test_email = test_email_record["test_email"] if test_email_record else None
     # 2. Get job details
-    job = await POSTGRES.fetch_one("SELECT input_text, filters FROM jobs WHERE id = $1", [job_id])
+    job = await POSTGRES.fetch_one("SELECT input_text, filters, crawl_options FROM jobs WHERE id = $1", [job_id])
     input_text = job["input_text"]
     filters = json.loads(job["filters"]) if job["filters"] else {}
     include = filters.get("include_domains", [])
     exclude = filters.get("exclude_domains", [])
+    crawl_options = json.loads(job["crawl_options"]) if job["crawl_options"] else {}
+
+    seen_urls = set()
+
+    async def scan_batch(batch):
+        filtered_urls_in_batch = []
+        for url in batch:
+            key = normalize_url(url)
+            if key in seen_urls or not include_filter(url, include, exclude):
+                continue
+            seen_urls.add(key)
+            filtered_urls_in_batch.append(url)
+        matches = await SCHEDULER.map(
+            job_id,
+            filtered_urls_in_batch,
+            lambda url: scan_url_for_text(job_id, input_text, url, test_email, crawl_options=crawl_options),
+        )
+        return any(matches)
 
     # 3. Crawl loop
     page_num = 1
     found_match = False
-    batch_match_found = False
-    while True:
-        if page_num > 1:
-            await POSTGRES.execute(
-                    """
-                    UPDATE crawl_events SET progress_updated_at = now() 
-                    WHERE id = $1
-                    """, [event_id]
-            )
-            
-        logging.info(f"[CRAWLER] Crawling page {page_num} for job_id={job_id}")
-        urls = search_google(input_text, page=page_num)  # 100 URLs max
-        if not urls:
-            break
-        # Break into 10-url batches
-        batches = [urls[i:i + 10] for i in range(0, len(urls), 10)]
-        for i, batch in enumerate(batches):
-            filtered_urls_in_batch = [url for url in batch if include_filter(url, include, exclude)]
-            for url in filtered_urls_in_batch:
-                match_found = await scan_url_for_text(job_id, input_text, url, test_email)
-                if match_found:
-                    found_match = True
-                    batch_match_found = True
-            if not batch_match_found:
-                logger.info(f"[CRAWLER] No matches found in batch {i + 1} for job_id={job_id}")
+    background_scans = []
+    # Pipelined pagination: the next results page is searched while the current one is scanned
+    next_search = asyncio.create_task(search_google(input_text, page=page_num))
+    try:
+        while True:
+            logging.info(f"[CRAWLER] Crawling page {page_num} for job_id={job_id}")
+            urls = await next_search  # 100 URLs max
+            if not urls:
+                break
+            next_search = asyncio.create_task(search_google(input_text, page=page_num + 1))
+            # Break into 10-url batches
+            batches = [urls[i:i + 10] for i in range(0, len(urls), 10)]
+            # The first batch decides whether this page, and the ones after it, are worth scanning
+            if not await scan_batch(batches[0]):
+                logger.info(f"[CRAWLER] No matches found in batch 1 for job_id={job_id}")
                 logger.info("Stopping further crawling")
+                logger.info(f"[CRAWLER] No matches found in page {page_num} for job_id={job_id}")
                 break
-        if batch_match_found:
+            found_match = True
+            # Remaining batches stream into the scheduler alongside the next page
+            background_scans.extend(asyncio.create_task(scan_batch(batch)) for batch in batches[1:])
             page_num += 1
-            batch_match_found = False  # Reset for next batch
-        else:
-            logger.info(f"[CRAWLER] No matches found in page {page_num} for job_id={job_id}")
-            break
+        # Only a crawl that ran to its end waits for the batches still in the scheduler
+        await asyncio.gather(*background_scans, return_exceptions=True)
+    finally:
+        # On cancellation (e.g. the event's lease was lost) or error nothing may keep scanning
+        # and saving results behind our back, so unfinished batches are cancelled, not awaited
+        next_search.cancel()
+        for task in background_scans:
+            task.cancel()
+        await asyncio.gather(next_search, *background_scans, return_exceptions=True)
+    SCHEDULER.forget_job(job_id)
     if not found_match:
         logger.info(f"[CRAWLER] No matches found for job_id={job_id} after crawling {page_num} pages.")
         if test_email:
-            logger.info(f"[CRAWLER] Sending 'no match found' email to {test_email}")
+            logger.info(f"[CRAWLER] Queueing 'no match found' email to {test_email}")
             
             subject = "No IP Infringements Found"
             body = f"""
@@ -315,9 +437,11 @@ async def crawler_fun(job_id, event_id):
             Third Chair
             """
             try:
-                await send_email(to_email=test_email, subject=subject, body=body.strip())
-                logger.info(f"[CRAWLER] ✅ Sent 'no infringement' email to {test_email}")
+                await POSTGRES.execute_transaction_with_results([
+                    outbox_insert("no_match", test_email, subject, body.strip(), job_id=job_id)
+                ])
+                logger.info(f"[CRAWLER] ✅ Queued 'no infringement' email to {test_email}")
             except Exception as e:
-                logger.exception(f"[CRAWLER] ❌ Failed to send email to {test_email}: {e}")
+                logger.exception(f"[CRAWLER] ❌ Failed to queue email to {test_email}: {e}")
         return 
     return
\ No newline at end of file
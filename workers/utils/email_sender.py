@@ -1,27 +1,12 @@
-import os
 import aiosmtplib
 from email.message import EmailMessage
-from dotenv import load_dotenv
-
-load_dotenv()
-
-SMTP_HOST = os.getenv("SMTP_HOST")
-SMTP_PORT = int(os.getenv("SMTP_PORT"))
-SMTP_USER = os.getenv("SMTP_USER")
-SMTP_PASS = os.getenv("SMTP_PASS")
+from utils.smtp_pool import SMTP_POOL
 
 
 async def send_outreach_email(msg) -> bool:
 
     try:
-        await aiosmtplib.send(
-            msg,
-            hostname=SMTP_HOST,
-            port=SMTP_PORT,
-            username=SMTP_USER,
-            password=SMTP_PASS,
-            use_tls=True,
-        )
+        await SMTP_POOL.send(msg)
         return True
     except aiosmtplib.SMTPRecipientsRefused as e:
         print(f"🚫 Invalid email: {e}")
@@ -0,0 +1,66 @@
+import os
+import re
+from typing import List, Optional, Set, Tuple
+
+# Word n-gram shingles over normalize()d text. A page sharing no shingle with the protected text
+# is rejected before any fuzzy scoring. Pairs rather than triples, so a copy with a word changed
+# every third word (which still scores in the 90s) keeps the unchanged pairs and is not rejected.
+SHINGLE_WORDS = int(os.getenv("SHINGLE_WORDS", 2))
+MIN_SHINGLE_HITS = int(os.getenv("MIN_SHINGLE_HITS", 1))
+
+WORD_PATTERN = re.compile(r"\S+")
+
+
+def shingle_set(words: List[str], k: int = SHINGLE_WORDS) -> Set[Tuple[str, ...]]:
+    return set(zip(*(words[i:] for i in range(k))))
+
+
+class NeedleFingerprint:
+    def __init__(self, normalized_needle: str, k: int = SHINGLE_WORDS):
+        self.text = normalized_needle
+        self.k = k
+        self.shingles = shingle_set(normalized_needle.split(), k)
+
+    def may_match(self, page_words: List[str]) -> bool:
+        if not self.shingles:
+            # Needle shorter than one shingle: nothing to filter on
+            return True
+        return not self.shingles.isdisjoint(zip(*(page_words[i:] for i in range(self.k))))
+
+    def hit_spans(self, normalized_page: str) -> List[Tuple[int, int]]:
+        """Character spans in the page of every shingle shared with the needle, in page order."""
+        spans = [(m.start(), m.end()) for m in WORD_PATTERN.finditer(normalized_page)]
+        words = [normalized_page[start:end] for start, end in spans]
+        k = self.k
+        return [
+            (spans[i][0], spans[i + k - 1][1])
+            for i, shingle in enumerate(zip(*(words[j:] for j in range(k))))
+            if shingle in self.shingles
+        ]
+
+    def locate(self, normalized_page: str) -> Optional[Tuple[int, int]]:
+        """
+        Span of the densest cluster of shared shingles, at most one needle length wide.
+        Returns None when the page shares fewer than MIN_SHINGLE_HITS shingles with the needle.
+        """
+        if not self.shingles:
+            return 0, len(normalized_page)
+        hits = self.hit_spans(normalized_page)
+        if len(hits) < MIN_SHINGLE_HITS:
+            return None
+
+        width = max(len(self.text), 1)
+        best_start, best_end, best_count = 0, 0, 0
+        left = 0
+        for right in range(len(hits)):
+            while hits[right][1] - hits[left][0] > width:
+                left += 1
+            if right - left + 1 > best_count:
+                best_count = right - left + 1
+                best_start, best_end = hits[left][0], hits[right][1]
+        return best_start, best_end
+
+    def search_window(self, region: Tuple[int, int], page_length: int) -> Tuple[int, int]:
+        """The located region padded by one needle length on each side, enough to hold the best alignment."""
+        pad = len(self.text)
+        return max(0, region[0] - pad), min(page_length, region[1] + pad)
@@ -0,0 +1,170 @@
+import os
+import re
+import logging
+import httpx
+from contextlib import asynccontextmanager
+from html.parser import HTMLParser
+from typing import Optional
+from utils.page_cache import PAGE_CACHE
+
+HTTP_FETCH_TIMEOUT_SECONDS = float(os.getenv("HTTP_FETCH_TIMEOUT_SECONDS", 10))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 50))
+HTTP_USER_AGENT = os.getenv(
+    "HTTP_USER_AGENT",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0 Safari/537.36"
+)
+# Pages with less visible text than this are assumed to be rendered client-side
+JS_RENDER_MIN_TEXT_CHARS = int(os.getenv("JS_RENDER_MIN_TEXT_CHARS", 500))
+# Visible text kept per page; the rest of a huge page is neither downloaded nor matched
+PAGE_TEXT_MAX_CHARS = int(os.getenv("PAGE_TEXT_MAX_CHARS", 5_000_000))
+
+# Everything else in <head> is one of these, so <head> itself is not skipped: a page that never
+# closes it would otherwise yield no text at all
+SKIPPED_TAGS = {"script", "style", "noscript", "template", "svg", "title"}
+SPA_ROOT_PATTERN = re.compile(r'<div[^>]+id=["\'](root|app|__next|__nuxt)["\'][^>]*>\s*</div>', re.IGNORECASE)
+# HTML carried over between streamed chunks so an SPA root split across two chunks is still seen
+SPA_ROOT_CARRY_CHARS = 512
+
+
+class HTTP:
+    _client: Optional[httpx.AsyncClient] = None
+
+    @classmethod
+    async def init(cls):
+        if cls._client is None:
+            cls._client = httpx.AsyncClient(
+                timeout=HTTP_FETCH_TIMEOUT_SECONDS,
+                follow_redirects=True,
+                headers={"User-Agent": HTTP_USER_AGENT},
+                limits=httpx.Limits(
+                    max_connections=HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+                ),
+            )
+
+    @classmethod
+    async def close(cls):
+        if cls._client:
+            await cls._client.aclose()
+            cls._client = None
+
+    @classmethod
+    async def get(cls, url: str, **kwargs) -> httpx.Response:
+        await cls.init()
+        return await cls._client.get(url, **kwargs)
+
+    @classmethod
+    async def head(cls, url: str, **kwargs) -> httpx.Response:
+        await cls.init()
+        return await cls._client.head(url, **kwargs)
+
+    @classmethod
+    @asynccontextmanager
+    async def stream(cls, url: str, **kwargs):
+        await cls.init()
+        async with cls._client.stream("GET", url, **kwargs) as response:
+            yield response
+
+
+class VisibleTextParser(HTMLParser):
+    def __init__(self, max_chars: int = PAGE_TEXT_MAX_CHARS):
+        super().__init__(convert_charrefs=True)
+        self._skip_depth = 0
+        self._remaining = max_chars
+        self.parts = []
+
+    @property
+    def full(self) -> bool:
+        return self._remaining <= 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif tag == "body":
+            # Nothing skipped in <head> can still be open once the body starts
+            self._skip_depth = 0
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS and self._skip_depth > 0:
+            self._skip_depth -= 1
+
+    def handle_data(self, data):
+        if not self._skip_depth and not self.full and data.strip():
+            data = data[:self._remaining]
+            self._remaining -= len(data) + 1
+            self.parts.append(data)
+
+
+def extract_visible_text(html: str) -> str:
+    parser = VisibleTextParser()
+    parser.feed(html)
+    parser.close()
+    return " ".join(parser.parts)
+
+
+async def fetch_page(url: str, use_cache: bool = True, keep_html: bool = False) -> Optional[dict]:
+    """
+    Stream a page over plain HTTP, reusing the page cache when allowed.
+    Returns {"html", "text", "needs_js", "status"} or None when the page must go through the browser.
+    An error response comes back with its status and needs_js set, so callers can tell a missing
+    page from one the browser might still render. status is None for fresh cached results.
+    The HTML is only kept when keep_html is set, and never for cached results.
+    """
+    entry = await PAGE_CACHE.get(url) if use_cache else None
+    if entry and PAGE_CACHE.is_fresh(entry):
+        return {"html": None, "text": entry["text"], "needs_js": False, "status": None}
+
+    headers = {}
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+
+    try:
+        async with HTTP.stream(url, headers=headers) as response:
+            if response.status_code == 304 and entry:
+                await PAGE_CACHE.touch(url, entry)
+                return {"html": None, "text": entry["text"], "needs_js": False, "status": 304}
+
+            content_type = response.headers.get("content-type", "")
+            if response.status_code >= 400:
+                logging.info(f"[HTTP] {url} returned {response.status_code}, falling back to browser")
+                return {"html": None, "text": "", "needs_js": True, "status": response.status_code}
+            if "html" not in content_type.lower():
+                logging.info(f"[HTTP] {url} returned {content_type}, falling back to browser")
+                return None
+
+            parser = VisibleTextParser()
+            html_parts = []
+            spa_root = False
+            carry = ""
+            async for chunk in response.aiter_text():
+                if keep_html:
+                    html_parts.append(chunk)
+                if not spa_root:
+                    window = carry + chunk
+                    spa_root = bool(SPA_ROOT_PATTERN.search(window))
+                    carry = window[-SPA_ROOT_CARRY_CHARS:]
+                parser.feed(chunk)
+                if parser.full and not keep_html:
+                    logging.info(f"[HTTP] {url} exceeds {PAGE_TEXT_MAX_CHARS} text chars, truncated")
+                    break
+            parser.close()
+            status = response.status_code
+            etag = response.headers.get("etag")
+            last_modified = response.headers.get("last-modified")
+    except Exception as e:
+        logging.info(f"[HTTP] Fetch failed for {url}, falling back to browser: {e}")
+        return None
+
+    text = " ".join(parser.parts)
+    needs_js = spa_root or len(text.strip()) < JS_RENDER_MIN_TEXT_CHARS
+    if use_cache and not needs_js:
+        # Client-rendered pages are cached by the browser tier once rendered
+        await PAGE_CACHE.put(url, text, etag=etag, last_modified=last_modified)
+    return {
+        "html": "".join(html_parts) if keep_html else None,
+        "text": text,
+        "needs_js": needs_js,
+        "status": status,
+    }
@@ -0,0 +1,305 @@
+import os
+import re
+from bisect import bisect_right
+from typing import List, Optional, Sequence, Tuple
+from rapidfuzz import fuzz, process
+from utils.fingerprint import NeedleFingerprint
+from utils.cpu_pool import get_shared
+
+# fuzzywuzzy stays the default: on long pages its partial_ratio scores well below RapidFuzz's
+# exact one, so the threshold of 85 is calibrated for it. Switching to "rapidfuzz" matches
+# more pages (and sends more outreach) until that threshold is recalibrated.
+MATCH_ENGINE = os.getenv("MATCH_ENGINE", "fuzzywuzzy")
+SNIPPET_MAX_CHARS = int(os.getenv("SNIPPET_MAX_CHARS", 1000))
+# Pages longer than this are matched chunk by chunk, so only one chunk is normalized at a time.
+# Chunks overlap by at least twice the longest needle in normalized characters, so a copy
+# straddling a boundary is still whole in one chunk however much whitespace the page has.
+MATCH_CHUNK_CHARS = int(os.getenv("MATCH_CHUNK_CHARS", 200_000))
+MATCH_CHUNK_OVERLAP_CHARS = int(os.getenv("MATCH_CHUNK_OVERLAP_CHARS", 2000))
+
+# One token per whitespace run, punctuation run or word run, mirroring the passes in normalize()
+NORMALIZE_TOKEN_PATTERN = re.compile(r"(\s+)|([^\w\s]+)|(\w+)")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+PUNCTUATION_PATTERN = re.compile(r"[^\w\s]")
+
+
+def normalize(text):
+    text = text.lower()
+    text = WHITESPACE_PATTERN.sub(' ', text)
+    text = PUNCTUATION_PATTERN.sub('', text)
+    return text.strip()
+
+
+class OffsetMap:
+    """Maps offsets in normalize()d text back to offsets in the original text."""
+
+    def __init__(self, norm_starts: List[int], orig_starts: List[int], orig_ends: List[int]):
+        self.norm_starts = norm_starts
+        self.orig_starts = orig_starts
+        self.orig_ends = orig_ends
+
+    def to_original(self, offset: int) -> int:
+        i = bisect_right(self.norm_starts, offset) - 1
+        if i < 0:
+            return self.orig_starts[0] if self.orig_starts else 0
+        return min(self.orig_starts[i] + offset - self.norm_starts[i], self.orig_ends[i])
+
+
+def normalize_with_offsets(text) -> Tuple[str, OffsetMap]:
+    """Same output as normalize(), built token by token so offsets can be mapped back in O(log n)."""
+    parts, norm_starts, orig_starts, orig_ends = [], [], [], []
+    length = 0
+    for m in NORMALIZE_TOKEN_PATTERN.finditer(text):
+        whitespace, punctuation, word = m.groups()
+        if punctuation:
+            continue
+        piece = " " if whitespace else word.lower()
+        norm_starts.append(length)
+        orig_starts.append(m.start())
+        orig_ends.append(m.end())
+        parts.append(piece)
+        length += len(piece)
+
+    normalized = "".join(parts)
+    stripped = normalized.lstrip()
+    lead = len(normalized) - len(stripped)
+    if lead:
+        norm_starts = [start - lead for start in norm_starts]
+    return stripped.rstrip(), OffsetMap(norm_starts, orig_starts, orig_ends)
+
+
+def normalized_offset(text: str, end: int) -> int:
+    """Offset in normalize(text) of position end in text, counted without building the normalized string."""
+    length = 0
+    seen_word = False
+    for m in NORMALIZE_TOKEN_PATTERN.finditer(text, 0, end):
+        whitespace, punctuation, word = m.groups()
+        if word:
+            length += len(word.lower())
+            seen_word = True
+        elif whitespace and seen_word:
+            length += 1
+    return length
+
+
+def snap_to_words(text: str, start: int, end: int) -> Tuple[int, int]:
+    """Widen a span that cuts through a word so it covers the whole word on either side."""
+    if 0 < start < len(text) and text[start - 1] != " ":
+        start = text.rfind(" ", 0, start) + 1
+    if 0 < end < len(text) and text[end - 1] != " ":
+        next_space = text.find(" ", end)
+        end = len(text) if next_space == -1 else next_space
+    return start, end
+
+
+def to_int_score(score: float, score_cutoff: int) -> int:
+    score = int(round(score))
+    return score if score >= score_cutoff else 0
+
+
+class RapidFuzzMatcher:
+    name = "rapidfuzz"
+    # Exact best-window scoring, so scoring only the region around the shared shingles loses nothing
+    windowed = True
+
+    def score(self, needle: str, haystack: str, score_cutoff: int = 0) -> int:
+        if not needle or not haystack:
+            return 0
+        # RapidFuzz prunes on the raw float score; allow for rounding up to the integer cutoff
+        score = fuzz.partial_ratio(needle, haystack, score_cutoff=max(0, score_cutoff - 0.5))
+        return to_int_score(score, score_cutoff)
+
+    def align(self, needle: str, haystack: str, score_cutoff: int = 0) -> Tuple[int, Optional[Tuple[int, int]]]:
+        """Score plus the (start, end) span of the best-matching window in haystack."""
+        if not needle or not haystack:
+            return 0, None
+        alignment = fuzz.partial_ratio_alignment(needle, haystack, score_cutoff=max(0, score_cutoff - 0.5))
+        if alignment is None:
+            return 0, None
+        score = to_int_score(alignment.score, score_cutoff)
+        return score, (alignment.dest_start, alignment.dest_end) if score else None
+
+    def score_many(self, needle: str, haystacks: Sequence[str], score_cutoff: int = 0) -> List[int]:
+        """Score one needle against many pages in a single call into RapidFuzz's C++ core."""
+        scores = [0] * len(haystacks)
+        if not needle:
+            return scores
+        results = process.extract(
+            needle,
+            haystacks,
+            scorer=fuzz.partial_ratio,
+            score_cutoff=max(0, score_cutoff - 0.5),
+            limit=None,
+        )
+        for _, score, index in results:
+            if haystacks[index]:
+                scores[index] = to_int_score(score, score_cutoff)
+        return scores
+
+
+class FuzzyWuzzyMatcher:
+    """The original scorer, and the default until the threshold is recalibrated for RapidFuzz."""
+    name = "fuzzywuzzy"
+    # Its heuristic partial_ratio depends on the text around a copy, so it scores the whole page as before
+    windowed = False
+
+    def __init__(self):
+        from fuzzywuzzy import fuzz as fuzzywuzzy_fuzz
+        self._fuzz = fuzzywuzzy_fuzz
+
+    def score(self, needle: str, haystack: str, score_cutoff: int = 0) -> int:
+        score = self._fuzz.partial_ratio(needle, haystack)
+        return score if score >= score_cutoff else 0
+
+    def align(self, needle: str, haystack: str, score_cutoff: int = 0) -> Tuple[int, Optional[Tuple[int, int]]]:
+        # fuzzywuzzy exposes no alignment; keep its score and take the window from RapidFuzz
+        score = self.score(needle, haystack, score_cutoff)
+        if not score:
+            return 0, None
+        alignment = fuzz.partial_ratio_alignment(needle, haystack)
+        return score, (alignment.dest_start, alignment.dest_end)
+
+    def score_many(self, needle: str, haystacks: Sequence[str], score_cutoff: int = 0) -> List[int]:
+        return [self.score(needle, haystack, score_cutoff) for haystack in haystacks]
+
+
+MATCHERS = {
+    RapidFuzzMatcher.name: RapidFuzzMatcher,
+    FuzzyWuzzyMatcher.name: FuzzyWuzzyMatcher,
+}
+
+
+def get_matcher(name: str = MATCH_ENGINE):
+    if name not in MATCHERS:
+        raise ValueError(f"Unknown match engine: {name}")
+    return MATCHERS[name]()
+
+
+MATCHER = get_matcher()
+
+
+def find_match(normalized_needle: str, normalized_page: str, fingerprint: NeedleFingerprint = None, score_cutoff: int = 0, page_words=None):
+    """
+    Shingle-filter the page, then align the needle only within the region around the shared shingles.
+    Returns (score, (start, end)) with the aligned span in the normalized page,
+    or (0, None) for pages rejected by the filter or scoring below score_cutoff.
+    """
+    fingerprint = fingerprint or NeedleFingerprint(normalized_needle)
+    if page_words is None:
+        page_words = normalized_page.split()
+    if not fingerprint.may_match(page_words):
+        return 0, None
+    region = fingerprint.locate(normalized_page)
+    if region is None:
+        return 0, None
+    if MATCHER.windowed:
+        window_start, window_end = fingerprint.search_window(region, len(normalized_page))
+    else:
+        window_start, window_end = 0, len(normalized_page)
+    score, span = MATCHER.align(normalized_needle, normalized_page[window_start:window_end], score_cutoff)
+    if span is None:
+        return score, None
+    return score, (window_start + span[0], window_start + span[1])
+
+
+def match_chunk(visible_text: str, needles: list, threshold: int, watchlist=None) -> list:
+    """
+    Match one page against every needle ({"job_id", "fingerprint"}), plus any watchlist
+    texts sharing a shingle with it. Returns one dict per needle at or above threshold,
+    with the aligned window as offsets into both the original and the normalized text.
+    """
+    normalized_content = normalize(visible_text)
+    page_words = normalized_content.split()
+    if watchlist is not None:
+        needles = needles + watchlist.candidates(page_words, exclude=[n["job_id"] for n in needles])
+
+    matches = []
+    offsets = None
+    for needle in needles:
+        fingerprint = needle["fingerprint"]
+        score, span = find_match(fingerprint.text, normalized_content, fingerprint, threshold, page_words)
+        if score < threshold or span is None:
+            continue
+        span = snap_to_words(normalized_content, *span)
+        if offsets is None:
+            # Only matched pages pay for the offset map
+            _, offsets = normalize_with_offsets(visible_text)
+        match_start, match_end = offsets.to_original(span[0]), offsets.to_original(span[1])
+        matches.append({
+            "job_id": needle["job_id"],
+            "score": score,
+            "snippet": visible_text[match_start:match_end].strip()[:SNIPPET_MAX_CHARS],
+            "match_start": match_start,
+            "match_end": match_end,
+            "match_norm_start": span[0],
+            "match_norm_end": span[1],
+        })
+    return matches
+
+
+def overlap_start(text: str, start: int, end: int, overlap: int) -> int:
+    """
+    Latest position after start from which text[pos:end] still normalizes to at least overlap
+    characters. Overlap is measured in normalized text because raw page text can be mostly
+    indentation and newlines, which normalize() collapses.
+    """
+    pos = max(start + 1, end - overlap)
+    while pos > start + 1 and len(normalize(text[pos:end])) < overlap:
+        pos = max(start + 1, end - 2 * (end - pos))
+    # Back up to the whitespace before the word we landed in, so no word is split
+    boundary = pos
+    while boundary > max(start + 1, pos - 100) and not text[boundary - 1].isspace():
+        boundary -= 1
+    return boundary if text[boundary - 1].isspace() else pos
+
+
+def chunk_bounds(text: str, chunk_chars: int, overlap: int):
+    """
+    (start, end) of overlapping chunks. Each chunk overlaps the next by at least overlap
+    normalized characters, so with overlap at least twice a needle's normalized length a
+    copy straddling a boundary is still whole in one chunk.
+    """
+    start = 0
+    while True:
+        end = min(len(text), start + chunk_chars)
+        # A chunk that is mostly whitespace grows until it carries enough text to overlap with
+        while end < len(text) and len(normalize(text[start:end])) < 2 * overlap:
+            end = min(len(text), start + 2 * (end - start))
+        yield start, end
+        if end == len(text):
+            return
+        start = overlap_start(text, start, end, overlap)
+
+
+def match_page(visible_text: str, needles: list, threshold: int, watchlist=None) -> list:
+    """
+    match_chunk() over the whole page, chunk by chunk for pages longer than MATCH_CHUNK_CHARS.
+    Keeps the best-scoring window per job.
+    """
+    longest = max((len(n["fingerprint"].text) for n in needles), default=0)
+    if watchlist is not None:
+        longest = max([longest] + [len(n["fingerprint"].text) for n in watchlist.needles.values()])
+    overlap = max(MATCH_CHUNK_OVERLAP_CHARS, 2 * longest)
+    chunk_chars = max(MATCH_CHUNK_CHARS, 2 * overlap)
+    if len(visible_text) <= chunk_chars:
+        return match_chunk(visible_text, needles, threshold, watchlist)
+
+    best = {}
+    for start, end in chunk_bounds(visible_text, chunk_chars, overlap):
+        for match in match_chunk(visible_text[start:end], needles, threshold, watchlist):
+            key = str(match["job_id"])
+            if key in best and best[key]["score"] >= match["score"]:
+                continue
+            match["match_start"] += start
+            match["match_end"] += start
+            best[key] = match
+
+    for match in best.values():
+        match["match_norm_start"] = normalized_offset(visible_text, match["match_start"])
+        match["match_norm_end"] = normalized_offset(visible_text, match["match_end"])
+    return list(best.values())
+
+
+def match_page_in_pool(visible_text: str, needles: list, threshold: int, use_watchlist: bool = False) -> list:
+    """match_page() as run by CPU_POOL workers, which hold the watchlist index as shared state."""
+    return match_page(visible_text, needles, threshold, get_shared("watchlist") if use_watchlist else None)
@@ -0,0 +1,85 @@
+import os
+import asyncio
+import logging
+import asyncpg
+from typing import Dict, Optional
+from utils.postgres import DATABASE_URL
+
+# With LISTEN working, polling is only a safety net; without it, workers fall back to the old cadence
+NOTIFY_FALLBACK_POLL_SECONDS = int(os.getenv("NOTIFY_FALLBACK_POLL_SECONDS", 300))
+NOTIFY_DISCONNECTED_POLL_SECONDS = int(os.getenv("NOTIFY_DISCONNECTED_POLL_SECONDS", 30))
+NOTIFY_CONNECT_TIMEOUT_SECONDS = int(os.getenv("NOTIFY_CONNECT_TIMEOUT_SECONDS", 10))
+
+
+class NOTIFY:
+    """
+    Postgres LISTEN/NOTIFY wakeups on one dedicated connection, one channel per table
+    (see notify_table_change() in init.sql). wait() always has a timeout, so a dropped
+    connection or a missed notification only degrades a worker back to polling.
+    """
+    _conn: Optional[asyncpg.Connection] = None
+    _events: Dict[str, asyncio.Event] = {}
+    _was_connected: bool = False
+
+    @classmethod
+    def _on_notify(cls, connection, pid, channel, payload):
+        event = cls._events.get(channel)
+        if event is not None:
+            event.set()
+
+    @classmethod
+    def connected(cls) -> bool:
+        return cls._conn is not None and not cls._conn.is_closed()
+
+    @classmethod
+    async def listen(cls, *channels: str):
+        new_channels = [channel for channel in channels if channel not in cls._events]
+        for channel in new_channels:
+            cls._events[channel] = asyncio.Event()
+
+        if cls.connected():
+            for channel in new_channels:
+                await cls._conn.add_listener(channel, cls._on_notify)
+            return
+
+        try:
+            conn = await asyncpg.connect(dsn=DATABASE_URL, timeout=NOTIFY_CONNECT_TIMEOUT_SECONDS)
+            for channel in cls._events:
+                await conn.add_listener(channel, cls._on_notify)
+        except Exception as e:
+            logging.warning(f"[NOTIFY] LISTEN unavailable, polling every {NOTIFY_DISCONNECTED_POLL_SECONDS}s: {e}")
+            return
+        cls._conn = conn
+        logging.info(f"[NOTIFY] Listening on {', '.join(cls._events)}")
+        if cls._was_connected:
+            # Anything sent while the connection was down is lost; make every waiter poll once
+            for event in cls._events.values():
+                event.set()
+        cls._was_connected = True
+
+    @classmethod
+    async def wait(cls, *channels: str, timeout: float = NOTIFY_FALLBACK_POLL_SECONDS) -> bool:
+        """Sleep until a notification on any of channels or the timeout. Returns True when notified."""
+        await cls.listen(*channels)
+        if not cls.connected():
+            timeout = min(timeout, NOTIFY_DISCONNECTED_POLL_SECONDS)
+
+        events = [cls._events[channel] for channel in channels]
+        if not any(event.is_set() for event in events):
+            waiters = [asyncio.create_task(event.wait()) for event in events]
+            try:
+                await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for waiter in waiters:
+                    waiter.cancel()
+
+        notified = any(event.is_set() for event in events)
+        for event in events:
+            event.clear()
+        return notified
+
+    @classmethod
+    async def close(cls):
+        if cls.connected():
+            await cls._conn.close()
+        cls._conn = None
@@ -0,0 +1,75 @@
+import json
+import logging
+import mimetypes
+import os
+from email.message import EmailMessage
+from typing import List, Optional
+from utils.attachment_cache import attach_cached
+
+Z_EMAIL_FROM = os.getenv("Z_EMAIL_FROM", os.getenv("SMTP_USER"))
+
+# Outbox rows still waiting on the dispatcher; used to keep callers from queueing a contact twice
+PENDING_MAIL_FOR_CONTACT = """
+    EXISTS (
+        SELECT 1 FROM mail_outbox mo
+        WHERE mo.contact_id = outreach_contacts.id AND mo.status IN ('PENDING', 'SENDING')
+    )
+"""
+
+
+def attachment(path: str, filename: str = None, mime_type: str = None) -> dict:
+    if mime_type is None:
+        mime_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    return {"path": path, "filename": filename or os.path.basename(path), "mime_type": mime_type}
+
+
+def outbox_insert(
+    kind: str,
+    to_email: str,
+    subject: str,
+    body: str,
+    attachments: Optional[List[dict]] = None,
+    contact_id=None,
+    contact_status_expected: str = None,
+    contact_status_on_sent: str = None,
+    contact_status_on_failure: str = None,
+    job_id=None,
+    job_status_on_sent: str = None,
+    reply_id=None,
+) -> tuple:
+    """(query, args, return_result) for POSTGRES.execute_transaction_with_results, so the mail
+    is queued in the same transaction as the state change that caused it."""
+    query = """
+        INSERT INTO mail_outbox (
+            kind, to_email, subject, body, attachments,
+            contact_id, contact_status_expected, contact_status_on_sent, contact_status_on_failure,
+            job_id, job_status_on_sent, reply_id
+        ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12)
+        RETURNING id
+    """
+    args = [
+        kind, to_email, subject, body, json.dumps(attachments or []),
+        contact_id, contact_status_expected, contact_status_on_sent, contact_status_on_failure,
+        job_id, job_status_on_sent, reply_id,
+    ]
+    return query, args, True
+
+
+def build_message(row) -> EmailMessage:
+    msg = EmailMessage()
+    msg["To"] = row["to_email"]
+    msg["From"] = Z_EMAIL_FROM
+    msg["Subject"] = row["subject"]
+    msg.set_content(row["body"])
+
+    attachments = row["attachments"]
+    if isinstance(attachments, str):
+        attachments = json.loads(attachments)
+    for item in attachments:
+        path = item["path"]
+        if not (path and os.path.isfile(path)):
+            logging.warning(f"[OUTBOX] Missing attachment: {path}")
+            continue
+        # Evidence files repeat across a contact's whole sequence; their encoded parts are cached by hash
+        attach_cached(msg, path, item["filename"], item["mime_type"])
+    return msg
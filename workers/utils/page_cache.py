@@ -0,0 +1,172 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import hashlib
+import logging
+from typing import Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+SHARED_DIR = os.getenv("SHARED_DIR", "/app/shared")
+PAGE_CACHE_DIR = os.getenv("PAGE_CACHE_DIR", os.path.join(SHARED_DIR, "page_cache"))
+PAGE_CACHE_TTL_HOURS = float(os.getenv("PAGE_CACHE_TTL_HOURS", 24))
+PAGE_CACHE_MAX_AGE_DAYS = float(os.getenv("PAGE_CACHE_MAX_AGE_DAYS", 30))
+PAGE_CACHE_MAX_ENTRIES = int(os.getenv("PAGE_CACHE_MAX_ENTRIES", 20000))
+PAGE_CACHE_MAX_MB = float(os.getenv("PAGE_CACHE_MAX_MB", 2048))
+PAGE_CACHE_EVICT_EVERY = int(os.getenv("PAGE_CACHE_EVICT_EVERY", 200))
+
+TRACKING_PARAM_PREFIXES = ("utm_",)
+TRACKING_PARAMS = {"fbclid", "gclid", "msclkid", "mc_cid", "mc_eid", "ref_src"}
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or "https").lower()
+    host = (parts.hostname or "").lower()
+    netloc = host
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{parts.port}"
+    path = parts.path or "/"
+    if len(path) > 1:
+        path = path.rstrip("/")
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PARAM_PREFIXES)
+    ))
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
+class PageCache:
+    """
+    On-disk cache of fetched page text keyed by normalized URL.
+
+    Entries older than the TTL are stale but kept for conditional re-fetches (ETag/Last-Modified).
+    Least recently used entries are evicted beyond max_entries or max_mb on disk, and anything
+    older than max_age. The cache is best-effort: a failed write is logged and the caller carries on.
+    """
+
+    def __init__(self, directory: str, ttl_hours: float, max_age_days: float, max_entries: int, max_mb: float):
+        self.directory = directory
+        self.ttl_seconds = ttl_hours * 3600
+        self.max_age_seconds = max_age_days * 86400
+        self.max_entries = max_entries
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._writes = 0
+
+    def _path(self, url: str) -> str:
+        key = hashlib.sha256(normalize_url(url).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def is_fresh(self, entry: dict) -> bool:
+        return time.time() - entry["fetched_at"] < self.ttl_seconds
+
+    def _read(self, path: str) -> Optional[dict]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.warning(f"[PAGE CACHE] Dropping unreadable entry {path}: {e}")
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        try:
+            os.utime(path)  # mtime doubles as the LRU clock
+        except OSError:
+            pass
+        return entry
+
+    def _write(self, path: str, entry: dict):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _evict(self):
+        entries = []
+        now = time.time()
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if now - stat.st_mtime > self.max_age_seconds:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                else:
+                    entries.append((stat.st_mtime, stat.st_size, path))
+
+        total_bytes = sum(size for _, size, _ in entries)
+        if len(entries) <= self.max_entries and total_bytes <= self.max_bytes:
+            return
+        entries.sort()
+        remaining = len(entries)
+        evicted = 0
+        for _, size, path in entries:
+            if remaining <= self.max_entries and total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            remaining -= 1
+            total_bytes -= size
+            evicted += 1
+        logging.info(
+            f"[PAGE CACHE] Evicted {evicted} least recently used pages, "
+            f"{remaining} left ({total_bytes // (1024 * 1024)} MB)"
+        )
+
+    async def get(self, url: str) -> Optional[dict]:
+        return await asyncio.to_thread(self._read, self._path(url))
+
+    async def put(self, url: str, text: str, etag: str = None, last_modified: str = None, rendered: bool = False):
+        entry = {
+            "url": normalize_url(url),
+            "text": text,
+            "content_hash": hashlib.sha256(text.encode("utf-8")).hexdigest(),
+            "etag": etag,
+            "last_modified": last_modified,
+            "rendered": rendered,
+            "fetched_at": time.time(),
+        }
+        try:
+            await asyncio.to_thread(self._write, self._path(url), entry)
+        except OSError as e:
+            logging.warning(f"[PAGE CACHE] Could not cache {url}: {e}")
+            return
+        self._writes += 1
+        if self._writes % PAGE_CACHE_EVICT_EVERY == 0:
+            try:
+                await asyncio.to_thread(self._evict)
+            except OSError as e:
+                logging.warning(f"[PAGE CACHE] Eviction failed: {e}")
+
+    async def touch(self, url: str, entry: dict):
+        entry["fetched_at"] = time.time()
+        try:
+            await asyncio.to_thread(self._write, self._path(url), entry)
+        except OSError as e:
+            logging.warning(f"[PAGE CACHE] Could not refresh {url}: {e}")
+
+
+PAGE_CACHE = PageCache(
+    PAGE_CACHE_DIR, PAGE_CACHE_TTL_HOURS, PAGE_CACHE_MAX_AGE_DAYS, PAGE_CACHE_MAX_ENTRIES, PAGE_CACHE_MAX_MB
+)
@@ -0,0 +1,57 @@
+import os
+import logging
+from typing import Optional
+from playwright.async_api import Error as PlaywrightError
+
+READINESS_STRATEGIES = ("dom_stable", "load", "domcontentloaded", "networkidle", "fixed")
+
+PAGE_READINESS = os.getenv("PAGE_READINESS", "dom_stable")
+PAGE_READINESS_CAP_MS = int(os.getenv("PAGE_READINESS_CAP_MS", 3000))
+DOM_STABLE_QUIET_MS = int(os.getenv("DOM_STABLE_QUIET_MS", 300))
+
+# Resolves once the DOM has seen no mutations for quietMs, or after capMs at the latest
+DOM_STABLE_SCRIPT = """
+([quietMs, capMs]) => new Promise(resolve => {
+    let quietTimer = setTimeout(done, quietMs);
+    const capTimer = setTimeout(done, capMs);
+    const observer = new MutationObserver(() => {
+        clearTimeout(quietTimer);
+        quietTimer = setTimeout(done, quietMs);
+    });
+    function done() {
+        observer.disconnect();
+        clearTimeout(quietTimer);
+        clearTimeout(capTimer);
+        resolve(true);
+    }
+    observer.observe(document.documentElement, {childList: true, subtree: true, characterData: true});
+})
+"""
+
+
+def readiness_settings(crawl_options: Optional[dict]):
+    crawl_options = crawl_options or {}
+    strategy = crawl_options.get("page_readiness") or PAGE_READINESS
+    if strategy not in READINESS_STRATEGIES:
+        logging.warning(f"[READINESS] Unknown strategy '{strategy}', using '{PAGE_READINESS}'")
+        strategy = PAGE_READINESS
+    cap_ms = crawl_options.get("readiness_cap_ms")
+    return strategy, PAGE_READINESS_CAP_MS if cap_ms is None else int(cap_ms)
+
+
+async def wait_until_ready(page, crawl_options: Optional[dict] = None):
+    """
+    Wait for a page navigated with wait_until="domcontentloaded" to be ready for extraction.
+    Never waits longer than the cap; a page that is still busy is processed as-is.
+    """
+    strategy, cap_ms = readiness_settings(crawl_options)
+    try:
+        if strategy == "fixed":
+            await page.wait_for_timeout(cap_ms)
+        elif strategy == "dom_stable":
+            await page.evaluate(DOM_STABLE_SCRIPT, [DOM_STABLE_QUIET_MS, cap_ms])
+        else:
+            await page.wait_for_load_state(strategy, timeout=cap_ms)
+    except PlaywrightError as e:
+        # Timeouts and mid-wait navigations both mean "extract what is rendered now"
+        logging.debug(f"[READINESS] '{strategy}' not reached within {cap_ms}ms for {page.url}: {e}")
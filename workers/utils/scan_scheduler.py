@@ -0,0 +1,120 @@
+import os
+import time
+import asyncio
+import logging
+from collections import defaultdict
+from urllib.parse import urlparse
+
+SCAN_CONCURRENCY = int(os.getenv("SCAN_CONCURRENCY", 8))
+SCAN_PER_DOMAIN_CONCURRENCY = int(os.getenv("SCAN_PER_DOMAIN_CONCURRENCY", 2))
+# No per-job cap by default: each crawl worker runs one job at a time, so a cap below
+# SCAN_CONCURRENCY would only idle slots. Lower it if several jobs share one scheduler.
+SCAN_PER_JOB_CONCURRENCY = int(os.getenv("SCAN_PER_JOB_CONCURRENCY", SCAN_CONCURRENCY))
+SCAN_DOMAIN_DELAY_SECONDS = float(os.getenv("SCAN_DOMAIN_DELAY_SECONDS", 1.0))
+
+
+class ScanScheduler:
+    """
+    Bounds concurrent scans globally, per job and per domain, and side requests
+    such as contact-page probes per domain.
+
+    Jobs acquire their own slot before the global one, so with per_job below
+    concurrency a single large job cannot hold every global slot while other
+    jobs wait. Per-domain state is dropped once a domain has no scans left and
+    its delay has passed, so it does not grow with every domain ever seen.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = SCAN_CONCURRENCY,
+        per_domain: int = SCAN_PER_DOMAIN_CONCURRENCY,
+        per_job: int = SCAN_PER_JOB_CONCURRENCY,
+        domain_delay: float = SCAN_DOMAIN_DELAY_SECONDS,
+    ):
+        self.concurrency = concurrency
+        self.per_domain = per_domain
+        self.per_job = per_job
+        self.domain_delay = domain_delay
+        self._global = asyncio.Semaphore(concurrency)
+        self._jobs = defaultdict(lambda: asyncio.Semaphore(self.per_job))
+        self._domains = defaultdict(lambda: asyncio.Semaphore(self.per_domain))
+        self._probes = defaultdict(lambda: asyncio.Semaphore(self.per_domain))
+        self._domain_locks = defaultdict(asyncio.Lock)
+        self._domain_last_start = {}
+        # Scans waiting on or running against each domain
+        self._domain_users = defaultdict(int)
+
+    async def _wait_for_domain_turn(self, domain: str):
+        async with self._domain_locks[domain]:
+            last_start = self._domain_last_start.get(domain)
+            if last_start is not None:
+                wait = last_start + self.domain_delay - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            self._domain_last_start[domain] = time.monotonic()
+
+    def _release_domain(self, domain: str):
+        self._domain_users[domain] -= 1
+        if self._domain_users[domain] > 0:
+            return
+        del self._domain_users[domain]
+        # Keep the last start until the delay has passed, so the next scan still waits its turn
+        remaining = self._domain_last_start.get(domain, 0) + self.domain_delay - time.monotonic()
+        if remaining > 0:
+            asyncio.get_running_loop().call_later(remaining, self._forget_domain, domain)
+        else:
+            self._forget_domain(domain)
+
+    def _forget_domain(self, domain: str):
+        if domain in self._domain_users:
+            return
+        self._domains.pop(domain, None)
+        self._probes.pop(domain, None)
+        self._domain_locks.pop(domain, None)
+        self._domain_last_start.pop(domain, None)
+
+    async def run(self, job_id, url: str, scan):
+        domain = urlparse(url).netloc.lower()
+        self._domain_users[domain] += 1
+        try:
+            async with self._jobs[str(job_id)]:
+                async with self._domains[domain]:
+                    await self._wait_for_domain_turn(domain)
+                    async with self._global:
+                        return await scan(url)
+        finally:
+            self._release_domain(domain)
+
+    async def probe(self, url: str, request):
+        """
+        Run `request(url)` within the domain's probe slots. Probes are usually sent from inside
+        a scan of the same domain, which already holds one of its scan slots, so they get slots
+        of their own rather than waiting on the scan slots.
+        """
+        domain = urlparse(url).netloc.lower()
+        self._domain_users[domain] += 1
+        try:
+            async with self._probes[domain]:
+                return await request(url)
+        finally:
+            self._release_domain(domain)
+
+    async def map(self, job_id, urls, scan):
+        """
+        Run `scan(url)` for every url concurrently.
+        Returns results in url order; a failing scan is logged and yields None.
+        """
+        async def _one(url):
+            try:
+                return await self.run(job_id, url, scan)
+            except Exception as e:
+                logging.exception(f"[SCHEDULER] Scan failed for {url}: {e}")
+                return None
+
+        return await asyncio.gather(*(_one(url) for url in urls))
+
+    def forget_job(self, job_id):
+        self._jobs.pop(str(job_id), None)
+
+
+SCHEDULER = ScanScheduler()
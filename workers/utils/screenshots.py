@@ -0,0 +1,138 @@
+import os
+import io
+import uuid
+import asyncio
+import hashlib
+import logging
+from typing import List, Optional
+
+try:
+    from PIL import Image, PngImagePlugin
+except ImportError:  # Without Pillow the page is saved as Playwright captured it, with no preview
+    Image = None
+
+SHARED_DIR = os.getenv("SHARED_DIR", "/app/shared")
+SCREENSHOT_DIR = os.path.join(SHARED_DIR, "images")
+PREVIEW_DIR = os.path.join(SHARED_DIR, "previews")
+# Chromium garbles single captures taller than its texture limit (~16k px), so long pages are taken in tiles
+SCREENSHOT_TILE_HEIGHT = int(os.getenv("SCREENSHOT_TILE_HEIGHT", 8000))
+# Evidence is cut off below this many CSS pixels; 0 captures the whole page however long
+SCREENSHOT_MAX_HEIGHT = int(os.getenv("SCREENSHOT_MAX_HEIGHT", 30000))
+# "webp" or "jpeg"; the preview is what emails carry and the API serves
+SCREENSHOT_PREVIEW_FORMAT = os.getenv("SCREENSHOT_PREVIEW_FORMAT", "webp").lower()
+SCREENSHOT_PREVIEW_WIDTH = int(os.getenv("SCREENSHOT_PREVIEW_WIDTH", 1280))
+SCREENSHOT_PREVIEW_MAX_HEIGHT = int(os.getenv("SCREENSHOT_PREVIEW_MAX_HEIGHT", 6000))
+SCREENSHOT_PREVIEW_QUALITY = int(os.getenv("SCREENSHOT_PREVIEW_QUALITY", 75))
+
+PREVIEW_EXTENSIONS = {"webp": ".webp", "jpeg": ".jpg"}
+# WebP cannot encode images taller than this
+WEBP_MAX_DIMENSION = 16383
+
+
+async def capture_tiles(page) -> List[bytes]:
+    """Full-page PNG captures, one per SCREENSHOT_TILE_HEIGHT band of the page."""
+    width, height = await page.evaluate(
+        "() => [document.documentElement.scrollWidth, document.documentElement.scrollHeight]"
+    )
+    capped = bool(SCREENSHOT_MAX_HEIGHT) and height > SCREENSHOT_MAX_HEIGHT
+    if capped:
+        logging.info(f"[SCREENSHOT] Page is {height}px tall, capturing the top {SCREENSHOT_MAX_HEIGHT}px")
+        height = SCREENSHOT_MAX_HEIGHT
+    if height <= SCREENSHOT_TILE_HEIGHT and not capped:
+        return [await page.screenshot(full_page=True)]
+
+    tiles = []
+    for top in range(0, height, SCREENSHOT_TILE_HEIGHT):
+        clip = {"x": 0, "y": top, "width": width, "height": min(SCREENSHOT_TILE_HEIGHT, height - top)}
+        tiles.append(await page.screenshot(clip=clip, full_page=True))
+    return tiles
+
+
+def stitch(tiles: List[bytes]) -> "Image.Image":
+    images = [Image.open(io.BytesIO(tile)) for tile in tiles]
+    if len(images) == 1:
+        return images[0]
+    stitched = Image.new(images[0].mode, (max(image.width for image in images), sum(image.height for image in images)))
+    top = 0
+    for image in images:
+        stitched.paste(image, (0, top))
+        top += image.height
+    return stitched
+
+
+def encode_evidence(image: "Image.Image", url: str, captured_at: str) -> bytes:
+    """Lossless, fully optimized PNG carrying where and when it was taken."""
+    info = PngImagePlugin.PngInfo()
+    info.add_text("Source", url)
+    info.add_text("Creation Time", captured_at)
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG", optimize=True, pnginfo=info)
+    return buffer.getvalue()
+
+
+def encode_preview(image: "Image.Image") -> bytes:
+    """Lossy preview of the top of the page, scaled down to SCREENSHOT_PREVIEW_WIDTH."""
+    if image.width > SCREENSHOT_PREVIEW_WIDTH:
+        height = round(image.height * SCREENSHOT_PREVIEW_WIDTH / image.width)
+        image = image.resize((SCREENSHOT_PREVIEW_WIDTH, height), Image.LANCZOS)
+    max_height = SCREENSHOT_PREVIEW_MAX_HEIGHT
+    if SCREENSHOT_PREVIEW_FORMAT == "webp":
+        max_height = min(max_height, WEBP_MAX_DIMENSION)
+    if image.height > max_height:
+        image = image.crop((0, 0, image.width, max_height))
+
+    buffer = io.BytesIO()
+    if SCREENSHOT_PREVIEW_FORMAT == "webp":
+        image.save(buffer, "WEBP", quality=SCREENSHOT_PREVIEW_QUALITY, method=4)
+    else:
+        image.convert("RGB").save(buffer, "JPEG", quality=SCREENSHOT_PREVIEW_QUALITY, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def write_file(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def process_screenshot(tiles: List[bytes], base_name: str, url: str, captured_at: str) -> dict:
+    """
+    Turn raw captures into the stored evidence PNG and its preview. The evidence file name
+    carries the start of its SHA-256, so a file can be checked against its name and the
+    hash stored with the crawl result. Runs off the event loop.
+    """
+    preview: Optional[bytes] = None
+    if Image is None:
+        evidence = tiles[0]
+    else:
+        image = stitch(tiles)
+        evidence = encode_evidence(image, url, captured_at)
+        try:
+            preview = encode_preview(image)
+        except Exception as e:
+            logging.warning(f"[SCREENSHOT] No preview for {url}: {e}")
+
+    sha256 = hashlib.sha256(evidence).hexdigest()
+    stamped_name = f"{base_name}_{sha256[:16]}"
+    path = os.path.join(SCREENSHOT_DIR, f"{stamped_name}.png")
+    write_file(path, evidence)
+
+    preview_path = None
+    if preview is not None:
+        preview_path = os.path.join(PREVIEW_DIR, f"{stamped_name}{PREVIEW_EXTENSIONS.get(SCREENSHOT_PREVIEW_FORMAT, '.jpg')}")
+        write_file(preview_path, preview)
+        logging.info(
+            f"[SCREENSHOT] {url}: {len(tiles)} tile(s), evidence {len(evidence) // 1024} KB, "
+            f"preview {len(preview) // 1024} KB"
+        )
+    return {"path": path, "sha256": sha256, "preview_path": preview_path}
+
+
+async def capture_screenshot(page, url: str, captured_at) -> dict:
+    """Capture the page as evidence. Returns {"path", "sha256", "preview_path"}; preview_path may be None."""
+    base_name = f"screenshot_{captured_at.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+    tiles = await capture_tiles(page)
+    if Image is None and len(tiles) > 1:
+        # Nothing to stitch tiles with; fall back to Chromium's single capture
+        tiles = [await page.screenshot(full_page=True)]
+    return await asyncio.to_thread(process_screenshot, tiles, base_name, url, captured_at.isoformat())
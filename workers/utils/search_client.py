@@ -0,0 +1,84 @@
+import os
+import json
+import random
+import asyncio
+import hashlib
+import logging
+import httpx
+from typing import List, Optional
+from utils.postgres import POSTGRES
+
+SERPER_API_KEY = os.getenv("SERPER_API_KEY")
+SERPER_API_URL = os.getenv("SERPER_API_URL")
+SERPER_TIMEOUT_SECONDS = float(os.getenv("SERPER_TIMEOUT_SECONDS", 15))
+SERPER_MAX_RETRIES = int(os.getenv("SERPER_MAX_RETRIES", 3))
+SERPER_BACKOFF_SECONDS = float(os.getenv("SERPER_BACKOFF_SECONDS", 1.0))
+SEARCH_CACHE_TTL_HOURS = int(os.getenv("SEARCH_CACHE_TTL_HOURS", 24))
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class RetryableSearchError(Exception):
+    pass
+
+
+class SEARCH:
+    _client: Optional[httpx.AsyncClient] = None
+
+    @classmethod
+    async def init(cls):
+        if cls._client is None:
+            cls._client = httpx.AsyncClient(
+                timeout=SERPER_TIMEOUT_SECONDS,
+                headers={"X-API-KEY": SERPER_API_KEY or ""},
+                limits=httpx.Limits(max_connections=10, max_keepalive_connections=10),
+            )
+
+    @classmethod
+    async def close(cls):
+        if cls._client:
+            await cls._client.aclose()
+            cls._client = None
+
+    @classmethod
+    async def post(cls, payload: dict) -> dict:
+        await cls.init()
+        for attempt in range(SERPER_MAX_RETRIES + 1):
+            try:
+                response = await cls._client.post(SERPER_API_URL, json=payload)
+                if response.status_code in RETRYABLE_STATUS_CODES:
+                    raise RetryableSearchError(f"Serper returned {response.status_code}")
+                response.raise_for_status()
+                return response.json()
+            except (httpx.TransportError, RetryableSearchError) as e:
+                if attempt == SERPER_MAX_RETRIES:
+                    raise
+                delay = SERPER_BACKOFF_SECONDS * (2 ** attempt) + random.uniform(0, SERPER_BACKOFF_SECONDS)
+                logging.warning(f"[SEARCH] {e}; retrying in {delay:.1f}s ({attempt + 1}/{SERPER_MAX_RETRIES})")
+                await asyncio.sleep(delay)
+
+
+def search_cache_key(query: str) -> str:
+    # Case and whitespace differences between near-identical jobs share one cache entry
+    normalized = " ".join(query.lower().split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+async def search_google(query, page=1, max_results=100) -> List[str]:
+    query_hash = search_cache_key(query)
+    cached = await POSTGRES.fetch_one("""
+        SELECT links FROM search_cache
+        WHERE query_hash = $1 AND page = $2 AND fetched_at > now() - INTERVAL '1 hour' * $3
+    """, (query_hash, page, SEARCH_CACHE_TTL_HOURS))
+    if cached:
+        logging.info(f"[SEARCH] Cache hit for page {page}")
+        return json.loads(cached["links"])[:max_results]
+
+    data = await SEARCH.post({"q": query, "page": page})
+    links = [r["link"] for r in data.get("organic", []) if "link" in r]
+
+    await POSTGRES.execute("""
+        INSERT INTO search_cache (query_hash, page, links, fetched_at) VALUES ($1, $2, $3, now())
+        ON CONFLICT (query_hash, page) DO UPDATE SET links = EXCLUDED.links, fetched_at = EXCLUDED.fetched_at
+    """, (query_hash, page, json.dumps(links)))
+    return links[:max_results]
@@ -1,12 +1,10 @@
-import os
-from email.message import EmailMessage
-from utils.email_sender import send_outreach_email
+from utils.outbox import attachment, outbox_insert
 from utils.postgres import POSTGRES
+from utils.templates import TEMPLATES
+import os
 import datetime
 import logging
 
-TEMPLATE_DIR = "/Users/amruthae/Personal/Third Chair/Browser-agent/third-chair-mirror/outreach/email_templates"
-
 STATUS_SEQUENCE = [
     ("NOT_CONTACTED", "SENT_1ST_MAIL"),
     ("SENT_1ST_MAIL", "SENT_2ND_MAIL"),
@@ -16,7 +14,8 @@ STATUS_SEQUENCE = [
     ("LEGAL_LETTER_READY", "COURT_READY")
 ]
 
-SHARED_DIR = os.getenv("SHARED_DIR", "/app/shared")
+def template_name(status: str) -> str:
+    return f"{status.lower()}.txt"
 
 def get_next_status(current_status: str) -> str:
     for curr, nxt in STATUS_SEQUENCE:
@@ -24,31 +23,18 @@ def get_next_status(current_status: str) -> str:
             return nxt
     return None
 
-async def send_email_with_template(
+async def queue_email_with_template(
         contact: dict,
 ):
     status = contact["status"]
     contact_id = contact["id"]
     to_email = contact["email"]
     crawl_result_id = contact["crawl_result_id"]
-    # 1. Load the template
     next_status = get_next_status(status)
-    template_path = os.path.join(SHARED_DIR, f"email_templates/{next_status.lower()}.txt")
-    if not os.path.exists(template_path):
-        raise FileNotFoundError(f"Template not found for status: {next_status}")
-
-    with open(template_path, "r", encoding="utf-8") as f:
-        content = f.read()
-    
-    if "Subject:" not in content:
-        raise ValueError("Template must start with 'Subject:'")
-
-    subject_line, body = content.split("\n", 1)
-    subject = subject_line.replace("Subject:", "").strip()
 
-    # 3. Fetch screenshot_path, ots_path, snippet
+    # 1. Fetch url, screenshot and preview paths, ots_path, snippet
     crawl_row = await POSTGRES.fetch_one("""
-        SELECT screenshot_path, ots_path, matched_snippet
+        SELECT url, screenshot_path, screenshot_sha256, preview_path, ots_path, matched_snippet
         FROM crawl_results
         WHERE id = $1
     """, (crawl_result_id,))
@@ -57,56 +43,52 @@ async def send_email_with_template(
         raise ValueError("Crawl result not found.")
 
     screenshot_path = crawl_row["screenshot_path"]
+    preview_path = crawl_row["preview_path"]
     ots_path = crawl_row["ots_path"]
     snippet = crawl_row["matched_snippet"] or "No snippet available."
+    now = datetime.datetime.now(datetime.timezone.utc)
 
-    # 4. Compose email
-    msg = EmailMessage()
-    msg["To"] = to_email
-    msg["From"] = os.getenv("Z_EMAIL_FROM")
-    msg["Subject"] = subject
+    # 2. Render the compiled template
+    subject, body = TEMPLATES.get(template_name(next_status)).render(
+        url=crawl_row["url"],
+        snippet=snippet.strip(),
+        email=to_email,
+        date=now.date().isoformat(),
+        timestamp=now.isoformat(),
+    )
 
+    # 3. Queue the email; mail_dispatch_worker sends it and moves the contact to the next stage
     full_body = (
         f"{body.strip()}\n\n"
         f"---\nMatched Content Snippet:\n\"{snippet.strip()}\"\n\n"
-        f"Timestamp: {datetime.datetime.now(datetime.timezone.utc).isoformat()}"
+        f"Timestamp: {now.isoformat()}"
     )
-    msg.set_content(full_body)
-
-    # 5. Attach files
-    for filepath, label in [(screenshot_path, "screenshot.png"), (ots_path, "evidence.ots")]:
-        if filepath and os.path.exists(filepath):
-            with open(filepath, "rb") as f:
-                file_data = f.read()
-                maintype, subtype = "application", "octet-stream"
-                msg.add_attachment(file_data, maintype=maintype, subtype=subtype, filename=label)
-        else:
-            print(f"[WARN] Missing attachment: {filepath}")
-
-    # 6. Send the email 
-    send_result = await send_outreach_email(msg) 
-    if send_result == "BOUNCED":
-        await POSTGRES.execute("""
-            UPDATE outreach_contacts
-            SET status = 'BOUNCED', is_processing = false, updated_at = now()
-            WHERE id = $1
-        """, (contact_id,))
-        return
-    elif send_result == "FAILED":
-        logging.error(f"[OUTREACH] Failed to send email to {to_email}.")
-        await POSTGRES.execute("""
-            UPDATE outreach_contacts
-            SET status = 'FAILED', is_processing = false, updated_at = now()
-            WHERE id = $1
-        """, (contact_id,))
-        return
-    elif send_result is True:
-        # Email was successfully sent → update to next stage
-        logging.info(f"[OUTREACH] Email sent to {to_email} for status {status}.")
-        final_status = get_next_status(status)
-
-        await POSTGRES.execute("""
-            UPDATE outreach_contacts
-            SET status = $1, is_processing = false, updated_at = now()
-            WHERE id = $2
-        """, (final_status, contact_id))
\ No newline at end of file
+    has_sha256 = bool(crawl_row["screenshot_sha256"])
+    if has_sha256:
+        full_body += f"\nEvidence screenshot SHA-256: {crawl_row['screenshot_sha256']}"
+    # Outreach carries the compressed preview; the lossless PNG stays on file as the stamped evidence.
+    # The timestamp proof covers that PNG, not the preview, so it only travels alongside the PNG.
+    if preview_path:
+        attachments = [attachment(preview_path, f"screenshot{os.path.splitext(preview_path)[1]}")]
+        if ots_path and has_sha256:
+            full_body += "\nThe attached screenshot is a preview; the evidence file with the SHA-256 above is timestamped and on file."
+    else:
+        attachments = [attachment(screenshot_path, "screenshot.png", "application/octet-stream")] if screenshot_path else []
+        if ots_path and screenshot_path:
+            attachments.append(attachment(ots_path, "evidence.ots", "application/octet-stream"))
+            if has_sha256:
+                full_body += "\nThe attached evidence.ots timestamp proof covers screenshot.png, the file with the SHA-256 above."
+    await POSTGRES.execute_transaction_with_results([
+        outbox_insert(
+            "outreach",
+            to_email,
+            subject,
+            full_body,
+            attachments,
+            contact_id=contact_id,
+            contact_status_expected=status,
+            contact_status_on_sent=next_status,
+            contact_status_on_failure="FAILED",
+        )
+    ])
+    logging.info(f"[OUTREACH] Queued {next_status} mail to {to_email} for status {status}.")
@@ -0,0 +1,107 @@
+import os
+import time
+import asyncio
+import aiosmtplib
+from email.message import EmailMessage
+from typing import List, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SMTP_HOST = os.getenv("SMTP_HOST")
+SMTP_PORT = int(os.getenv("SMTP_PORT", 465))
+SMTP_USER = os.getenv("SMTP_USER")
+SMTP_PASS = os.getenv("SMTP_PASS")
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", 3))
+# Servers drop idle sessions after a while; older sessions are probed with NOOP before reuse
+SMTP_IDLE_CHECK_SECONDS = int(os.getenv("SMTP_IDLE_CHECK_SECONDS", 30))
+SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", 100))
+SMTP_TIMEOUT_SECONDS = float(os.getenv("SMTP_TIMEOUT_SECONDS", 30))
+
+
+class PooledConnection:
+    def __init__(self):
+        self.client = aiosmtplib.SMTP(
+            hostname=SMTP_HOST,
+            port=SMTP_PORT,
+            username=SMTP_USER,
+            password=SMTP_PASS,
+            use_tls=True,
+            timeout=SMTP_TIMEOUT_SECONDS,
+        )
+        self.messages_sent = 0
+        self.last_used = 0.0
+
+    async def connect(self):
+        # connect() runs EHLO and AUTH as well, since credentials are set on the client
+        await self.client.connect()
+        self.messages_sent = 0
+        self.last_used = time.monotonic()
+
+    async def ensure_alive(self):
+        if not self.client.is_connected:
+            await self.connect()
+            return
+        if time.monotonic() - self.last_used > SMTP_IDLE_CHECK_SECONDS:
+            try:
+                await self.client.noop()
+            except aiosmtplib.SMTPException:
+                self.client.close()
+                await self.connect()
+
+    async def quit(self):
+        try:
+            if self.client.is_connected:
+                await self.client.quit()
+        except aiosmtplib.SMTPException:
+            self.client.close()
+
+
+class SMTP_POOL:
+    """
+    Up to SMTP_POOL_SIZE logged-in SMTP sessions shared by every sender in the process.
+    Each session carries many messages, so TLS and AUTH are paid once per session, not per mail.
+    """
+    _idle: Optional[asyncio.LifoQueue] = None
+    _all: List[PooledConnection] = []
+
+    @classmethod
+    def _init(cls):
+        if cls._idle is None:
+            # LIFO keeps traffic on the most recently used session, letting the rest idle out
+            cls._idle = asyncio.LifoQueue()
+            cls._all = [PooledConnection() for _ in range(SMTP_POOL_SIZE)]
+            for connection in cls._all:
+                cls._idle.put_nowait(connection)
+
+    @classmethod
+    async def send(cls, msg: EmailMessage):
+        """Send msg on a pooled session. Raises aiosmtplib errors just like aiosmtplib.send()."""
+        cls._init()
+        connection = await cls._idle.get()
+        try:
+            await connection.ensure_alive()
+            try:
+                await connection.client.send_message(msg)
+            except aiosmtplib.SMTPServerDisconnected:
+                # The server closed the session between our check and the send; one retry on a new one
+                connection.client.close()
+                await connection.connect()
+                await connection.client.send_message(msg)
+            connection.messages_sent += 1
+            connection.last_used = time.monotonic()
+            if connection.messages_sent >= SMTP_MAX_MESSAGES_PER_CONNECTION:
+                await connection.quit()
+        except (aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPConnectError, aiosmtplib.SMTPAuthenticationError):
+            connection.client.close()
+            raise
+        finally:
+            cls._idle.put_nowait(connection)
+
+    @classmethod
+    async def close(cls):
+        if cls._idle is None:
+            return
+        await asyncio.gather(*(connection.quit() for connection in cls._all), return_exceptions=True)
+        cls._idle = None
+        cls._all = []
@@ -0,0 +1,107 @@
+import os
+import time
+import logging
+from string import Template
+from typing import Dict, Iterable, Optional, Tuple
+
+SHARED_DIR = os.getenv("SHARED_DIR", "/app/shared")
+EMAIL_TEMPLATE_DIR = os.getenv("EMAIL_TEMPLATE_DIR", os.path.join(SHARED_DIR, "email_templates"))
+# How often a template's mtime is checked for edits; 0 checks on every use
+TEMPLATE_RELOAD_CHECK_SECONDS = float(os.getenv("TEMPLATE_RELOAD_CHECK_SECONDS", 5))
+
+# Placeholders templates may use, e.g. "$url" or "${snippet}"; "$$" is a literal dollar sign
+TEMPLATE_PLACEHOLDERS = {"url", "snippet", "email", "date", "timestamp"}
+
+
+def template_identifiers(template: Template) -> set:
+    """Placeholder names used in template; Template.get_identifiers() needs Python 3.11+."""
+    return {
+        m.group("named") or m.group("braced")
+        for m in template.pattern.finditer(template.template)
+        if m.group("named") or m.group("braced")
+    }
+
+
+class EmailTemplate:
+    """A template file compiled once: first line "Subject: ...", the rest is the body."""
+
+    def __init__(self, name: str, content: str, mtime: float):
+        subject_line, _, body = content.partition("\n")
+        subject = subject_line.replace("Subject:", "", 1).strip()
+        if not subject:
+            raise ValueError(f"Template {name} must start with a 'Subject:' line")
+        if not body.strip():
+            raise ValueError(f"Template {name} has an empty body")
+
+        self.name = name
+        self.mtime = mtime
+        self.subject = Template(subject)
+        self.body = Template(body.strip())
+        for part in (self.subject, self.body):
+            # A bare "$" (e.g. "$500") is left as written by safe_substitute; only misspelt names are errors
+            unknown = template_identifiers(part) - TEMPLATE_PLACEHOLDERS
+            if unknown:
+                raise ValueError(f"Template {name} uses unknown placeholders: {', '.join(sorted(unknown))}")
+
+    def render(self, **values) -> Tuple[str, str]:
+        return self.subject.safe_substitute(values), self.body.safe_substitute(values)
+
+
+class TEMPLATES:
+    """
+    Every email template, read and compiled once per process. A template is re-read only
+    when its file's mtime changes; if the edited file is broken, the last good version
+    keeps being used and the error is logged.
+    """
+    _templates: Dict[str, EmailTemplate] = {}
+    _checked_at: Dict[str, float] = {}
+
+    @classmethod
+    def _path(cls, name: str) -> str:
+        return os.path.join(EMAIL_TEMPLATE_DIR, name)
+
+    @classmethod
+    def _load(cls, name: str) -> EmailTemplate:
+        path = cls._path(name)
+        mtime = os.stat(path).st_mtime
+        with open(path, "r", encoding="utf-8") as f:
+            template = EmailTemplate(name, f.read(), mtime)
+        cls._templates[name] = template
+        return template
+
+    @classmethod
+    def validate(cls, required: Iterable[str] = ()):
+        """Compile every template on disk plus the required ones. Raises listing all problems at once."""
+        names = set(required)
+        if os.path.isdir(EMAIL_TEMPLATE_DIR):
+            names.update(name for name in os.listdir(EMAIL_TEMPLATE_DIR) if name.endswith(".txt"))
+        errors = []
+        for name in sorted(names):
+            try:
+                cls._load(name)
+                cls._checked_at[name] = time.monotonic()
+            except (OSError, ValueError) as e:
+                errors.append(f"{name}: {e}")
+        if errors:
+            raise ValueError("Broken email templates:\n  " + "\n  ".join(errors))
+        logging.info(f"[TEMPLATES] {len(names)} email templates compiled from {EMAIL_TEMPLATE_DIR}")
+
+    @classmethod
+    def get(cls, name: str) -> EmailTemplate:
+        template: Optional[EmailTemplate] = cls._templates.get(name)
+        if template is None:
+            template = cls._load(name)
+            cls._checked_at[name] = time.monotonic()
+            return template
+
+        now = time.monotonic()
+        if now - cls._checked_at.get(name, 0) < TEMPLATE_RELOAD_CHECK_SECONDS:
+            return template
+        cls._checked_at[name] = now
+        try:
+            if os.stat(cls._path(name)).st_mtime != template.mtime:
+                template = cls._load(name)
+                logging.info(f"[TEMPLATES] Reloaded {name}")
+        except (OSError, ValueError) as e:
+            logging.error(f"[TEMPLATES] Keeping previous version of {name}: {e}")
+        return template
@@ -0,0 +1,85 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Dict, List, Set
+from utils.postgres import POSTGRES
+from utils.cpu_pool import CPU_POOL
+from utils.matcher import normalize
+from utils.fingerprint import NeedleFingerprint, shingle_set, MIN_SHINGLE_HITS
+
+# Scan every fetched page against all protected texts, not only the crawling job's own
+WATCHLIST_MODE = os.getenv("WATCHLIST_MODE", "false").lower() == "true"
+WATCHLIST_REFRESH_SECONDS = int(os.getenv("WATCHLIST_REFRESH_SECONDS", 300))
+# Jobs still being worked; finished or failed cases get no new results or outreach
+WATCHLIST_JOB_STATUSES = ["PENDING", "CRAWLING", "OUTREACHING", "GENERATING_LETTER", "SENT_MAIL"]
+
+
+class WatchlistIndex:
+    """Inverted index from word shingle to the protected texts containing it."""
+
+    def __init__(self, rows):
+        self.needles: Dict[str, dict] = {}
+        self.index: Dict[tuple, Set[str]] = defaultdict(set)
+        for row in rows:
+            job_id = str(row["id"])
+            fingerprint = NeedleFingerprint(normalize(row["input_text"]))
+            filters = json.loads(row["filters"]) if row["filters"] else {}
+            self.needles[job_id] = {
+                "job_id": row["id"],
+                "fingerprint": fingerprint,
+                "test_email": row["test_email"],
+                # The job's own domain filters, applied to its watchlist matches like to its crawl
+                "include_domains": filters.get("include_domains", []),
+                "exclude_domains": filters.get("exclude_domains", []),
+            }
+            for shingle in fingerprint.shingles:
+                self.index[shingle].add(job_id)
+        self.keys = frozenset(self.index)
+
+    def __len__(self):
+        return len(self.needles)
+
+    def candidates(self, page_words: List[str], exclude=()) -> List[dict]:
+        if not self.keys or not page_words:
+            return []
+        k = next(iter(self.needles.values()))["fingerprint"].k
+        shared = shingle_set(page_words, k) & self.keys
+        hits = defaultdict(int)
+        for shingle in shared:
+            for job_id in self.index[shingle]:
+                hits[job_id] += 1
+        excluded = {str(job_id) for job_id in exclude}
+        return [
+            self.needles[job_id] for job_id, count in hits.items()
+            if count >= MIN_SHINGLE_HITS and job_id not in excluded
+        ]
+
+
+class WATCHLIST:
+    _index: WatchlistIndex = WatchlistIndex([])
+    _loaded_at: float = 0.0
+    _lock: asyncio.Lock = None
+
+    @classmethod
+    async def get(cls) -> WatchlistIndex:
+        if cls._lock is None:
+            cls._lock = asyncio.Lock()
+        async with cls._lock:
+            if time.monotonic() - cls._loaded_at > WATCHLIST_REFRESH_SECONDS:
+                rows = await POSTGRES.fetch_all("""
+                    SELECT j.id, j.input_text, j.filters, t.test_email
+                    FROM jobs j
+                    LEFT JOIN test_email_map t ON t.job_id = j.id
+                    WHERE j.status::text = ANY($1::text[]) AND j.input_text IS NOT NULL
+                """, (WATCHLIST_JOB_STATUSES,))
+                index = WatchlistIndex(rows)
+                if index.needles.keys() != cls._index.needles.keys():
+                    # Pool workers get the index once at start-up rather than pickled with every page
+                    CPU_POOL.set_shared("watchlist", index)
+                cls._index = index
+                cls._loaded_at = time.monotonic()
+                logging.info(f"[WATCHLIST] Indexed {len(cls._index)} protected texts")
+        return cls._index
@@ -0,0 +1,58 @@
+import os
+import json
+import asyncio
+import logging
+import whois
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+from utils.postgres import POSTGRES
+
+WHOIS_THREADS = int(os.getenv("WHOIS_THREADS", 4))
+WHOIS_CACHE_TTL_DAYS = int(os.getenv("WHOIS_CACHE_TTL_DAYS", 30))
+
+# Second-level labels under which registrations happen one level deeper (example.co.uk)
+MULTI_PART_SUFFIXES = {
+    "co", "com", "net", "org", "gov", "edu", "ac", "or", "ne", "go", "gen", "ltd", "plc", "nic"
+}
+
+_executor = ThreadPoolExecutor(max_workers=WHOIS_THREADS, thread_name_prefix="whois")
+
+
+def registrable_domain(domain: str) -> str:
+    labels = domain.lower().split(":")[0].strip(".").split(".")
+    if len(labels) >= 3 and len(labels[-1]) == 2 and labels[-2] in MULTI_PART_SUFFIXES:
+        return ".".join(labels[-3:])
+    return ".".join(labels[-2:])
+
+
+def _lookup_emails(domain: str) -> List[str]:
+    whois_info = whois.whois(domain)
+    if isinstance(whois_info.emails, list):
+        return list(whois_info.emails)
+    elif whois_info.emails:
+        return [whois_info.emails]
+    return []
+
+
+async def get_whois_emails(domain: str) -> List[str]:
+    domain = registrable_domain(domain)
+
+    cached = await POSTGRES.fetch_one("""
+        SELECT emails FROM whois_cache
+        WHERE domain = $1 AND fetched_at > now() - INTERVAL '1 day' * $2
+    """, (domain, WHOIS_CACHE_TTL_DAYS))
+    if cached:
+        return json.loads(cached["emails"])
+
+    loop = asyncio.get_running_loop()
+    try:
+        emails = await loop.run_in_executor(_executor, _lookup_emails, domain)
+    except Exception as e:
+        logging.info(f"[WHOIS] Lookup failed for {domain}: {e}")
+        return []
+
+    await POSTGRES.execute("""
+        INSERT INTO whois_cache (domain, emails, fetched_at) VALUES ($1, $2, now())
+        ON CONFLICT (domain) DO UPDATE SET emails = EXCLUDED.emails, fetched_at = EXCLUDED.fetched_at
+    """, (domain, json.dumps(emails)))
+    return emails
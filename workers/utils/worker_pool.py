@@ -0,0 +1,110 @@
+import time
+import asyncio
+import logging
+from typing import Dict, Optional, Set
+
+
+class WorkerPool:
+    """
+    Runs coroutines with at most max_in_flight at a time. submit() waits for a free slot,
+    so a producer that claims work faster than it is done is slowed down instead of piling
+    up tasks. Every task is held until it finishes, so none is garbage collected mid-flight.
+    """
+
+    def __init__(self, name: str, max_in_flight: int):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+    @property
+    def available(self) -> int:
+        return max(0, self.max_in_flight - len(self._tasks))
+
+    async def wait_for_slot(self):
+        await self._slots.acquire()
+        self._slots.release()
+
+    async def submit(self, coro_fn, *args) -> asyncio.Task:
+        await self._slots.acquire()
+        task = asyncio.create_task(coro_fn(*args))
+        self._tasks.add(task)
+        task.add_done_callback(self._done)
+        return task
+
+    def _done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        self._slots.release()
+        if not task.cancelled() and task.exception() is not None:
+            logging.error(f"[{self.name}] Task failed: {task.exception()!r}")
+
+    async def drain(self, timeout: float):
+        """Let in-flight tasks finish for up to timeout seconds, then cancel the rest."""
+        if not self._tasks:
+            return
+        logging.info(f"[{self.name}] Draining {len(self._tasks)} in-flight task(s)...")
+        _, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logging.warning(f"[{self.name}] Cancelled {len(pending)} task(s) still running after {timeout}s")
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+class RateLimiter:
+    """
+    Token bucket per key (e.g. recipient mail provider), refilled at per_minute tokens a minute.
+    try_acquire() never waits, so callers can set work aside instead of holding a slot while a
+    key has no token. Buckets that have refilled are dropped, so idle keys do not pile up.
+    """
+
+    PRUNE_EVERY_SECONDS = 60
+
+    def __init__(self, per_minute: float, overrides: Optional[Dict[str, float]] = None):
+        self.per_minute = per_minute
+        self.overrides = overrides or {}
+        self._buckets: Dict[str, list] = {}
+        self._next_prune = time.monotonic() + self.PRUNE_EVERY_SECONDS
+
+    def rate_for(self, key: str) -> float:
+        return self.overrides.get(key, self.per_minute)
+
+    def _capacity(self, rate: float) -> float:
+        return max(1.0, rate / 60)
+
+    def try_acquire(self, key: str) -> float:
+        """Take a token for key and return 0, or return the seconds until one is available."""
+        rate = self.rate_for(key)
+        if rate <= 0:
+            return 0
+        now = time.monotonic()
+        if now >= self._next_prune:
+            self._prune(now)
+        capacity = self._capacity(rate)
+        tokens, updated = self._buckets.get(key, [capacity, now])
+        tokens = min(capacity, tokens + (now - updated) * rate / 60)
+        if tokens < 1:
+            self._buckets[key] = [tokens, now]
+            return (1 - tokens) * 60 / rate
+        self._buckets[key] = [tokens - 1, now]
+        return 0
+
+    def _prune(self, now: float):
+        self._next_prune = now + self.PRUNE_EVERY_SECONDS
+        for key, (tokens, updated) in list(self._buckets.items()):
+            rate = self.rate_for(key)
+            if tokens + (now - updated) * rate / 60 >= self._capacity(rate):
+                del self._buckets[key]
+
+
+def parse_rate_overrides(value: str) -> Dict[str, float]:
+    """"gmail.com=20,outlook.com=10" -> {"gmail.com": 20.0, "outlook.com": 10.0}"""
+    overrides = {}
+    for item in filter(None, (part.strip() for part in (value or "").split(","))):
+        key, _, rate = item.partition("=")
+        overrides[key.strip().lower()] = float(rate)
+    return overrides